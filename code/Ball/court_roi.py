@@ -0,0 +1,54 @@
+import json
+
+import numpy as np
+
+from terrain.homography import court_mask
+from terrain.timeline import court_json_for_frame
+
+
+class CourtRoi:
+    """
+    Région de recherche de la balle déduite de la calibration du terrain.
+
+    Le masque du terrain de référence (marges hors-jeu comprises) est projeté
+    une seule fois dans l'image puis dilaté de ``margin`` pixels, pour garder
+    la balle en l'air au-dessus du terrain. ``bbox`` est le rectangle
+    englobant du masque (crop passé à YOLO) et ``contains`` élimine les
+    détections hors du masque (public, tableau d'affichage, ciel).
+    """
+
+    def __init__(self, mask):
+        self.mask = mask.astype(bool)
+        ys, xs = np.nonzero(self.mask)
+        self.bbox = (int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1)
+
+    @classmethod
+    def from_terrain_json(cls, terrain_json_path, frame_size, margin=100, frame=0):
+        """
+        Construit la région à partir du JSON du terrain (calibration unique
+        ou ``CourtTimeline``, calibration en vigueur à ``frame``).
+
+        Returns:
+            CourtRoi | None: None si le terrain n'est pas exploitable
+        """
+        court = json.loads(court_json_for_frame(terrain_json_path, frame))
+        points = [(p["x"], p["y"]) if p else None for p in court["points"]]
+        mask = court_mask(points, frame_size, margin)
+        if mask is None or not mask.any():
+            return None
+        return cls(mask)
+
+    def contains(self, xs, ys):
+        """Vrai pour les points (x, y) situés dans la région"""
+        h, w = self.mask.shape
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+        result = np.zeros(xs.shape, dtype=bool)
+        result[inside] = self.mask[ys[inside], xs[inside]]
+        return result
+
+    def crop(self, frame):
+        """Crop de la frame au rectangle englobant de la région"""
+        x0, y0, x1, y1 = self.bbox
+        return frame[y0:y1, x0:x1]
@@ -0,0 +1,109 @@
+import numpy as np
+
+
+class ConstantAccelerationKalman:
+    """
+    Filtre de Kalman 2D à accélération constante.
+
+    État : (x, y, vx, vy, ax, ay), en pixels et en frames ; seules les
+    positions (x, y) sont mesurées.
+    """
+
+    def __init__(self, process_noise=1.0, measurement_noise=4.0, dt=1.0):
+        self.F = np.eye(6)
+        self.F[0, 2] = self.F[1, 3] = self.F[2, 4] = self.F[3, 5] = dt
+        self.F[0, 4] = self.F[1, 5] = 0.5 * dt**2
+        self.H = np.zeros((2, 6))
+        self.H[0, 0] = self.H[1, 1] = 1.0
+        # Bruit de processus : variation aléatoire de l'accélération (jerk)
+        g = np.array([dt**3 / 6, dt**3 / 6, dt**2 / 2, dt**2 / 2, dt, dt])
+        self.Q = process_noise * np.outer(g, g) * np.kron(np.ones((3, 3)), np.eye(2))
+        self.R = measurement_noise * np.eye(2)
+        self.x = None
+        self.P = None
+
+    @property
+    def initialized(self):
+        return self.x is not None
+
+    def reset(self):
+        self.x = self.P = None
+
+    def predict(self):
+        """Avance l'état d'une frame et renvoie la position prédite (x, y)"""
+        if self.x is None:
+            return None
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        return self.x[0], self.x[1]
+
+    def update(self, x, y):
+        """Corrige l'état avec une position mesurée"""
+        z = np.array([x, y], dtype=np.float64)
+        if self.x is None:
+            self.x = np.concatenate([z, np.zeros(4)])
+            self.P = np.diag([self.R[0, 0], self.R[1, 1], 1e3, 1e3, 1e2, 1e2])
+            return
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ (z - self.H @ self.x)
+        self.P = (np.eye(6) - K @ self.H) @ self.P
+
+
+class KalmanRoiSearch:
+    """
+    Recherche de la balle dans une fenêtre autour de la position prédite.
+
+    La fenêtre de ``roi_size`` pixels est centrée sur la prédiction du filtre
+    de Kalman du ``tracker`` (``BallTracker``) ; la recherche se fait sur la
+    frame entière tant que la balle n'est pas suivie, après ``max_misses``
+    frames consécutives sans balle et toutes les ``full_frame_interval``
+    frames.
+    """
+
+    def __init__(self, tracker, roi_size=320, max_misses=5, full_frame_interval=30):
+        self.tracker = tracker
+        self.roi_size = roi_size
+        self.max_misses = max_misses
+        self.full_frame_interval = full_frame_interval
+        self.roi_searches = 0
+        self.full_searches = 0
+
+    def window(self, frame_no, shape):
+        """
+        Fenêtre de recherche (x0, y0, x1, y1) pour la frame, ou None pour
+        chercher dans la frame entière.
+        """
+        prediction = self.tracker.predict()
+        h, w = shape[:2]
+        if (
+            prediction is None
+            or self.tracker.misses >= self.max_misses
+            or frame_no % self.full_frame_interval == 0
+            or self.roi_size >= min(h, w)
+        ):
+            return None
+        half = self.roi_size // 2
+        x0 = int(min(max(prediction[0] - half, 0), w - self.roi_size))
+        y0 = int(min(max(prediction[1] - half, 0), h - self.roi_size))
+        return x0, y0, x0 + self.roi_size, y0 + self.roi_size
+
+    def detect(self, frame, frame_no, detect_fn):
+        """
+        Cherche la balle dans la fenêtre prédite (ou la frame entière).
+
+        Args:
+            detect_fn: ``detect_fn(images, imgsz, offset)`` → liste de
+                (x, y, confiance) ou None, en coordonnées de la frame
+                (``offset`` : position du crop dans la frame)
+
+        Returns:
+            tuple | None: (x, y, confiance) en coordonnées de la frame
+        """
+        window = self.window(frame_no, frame.shape)
+        if window is None:
+            self.full_searches += 1
+            return detect_fn([frame])[0]
+        self.roi_searches += 1
+        x0, y0, x1, y1 = window
+        return detect_fn([frame[y0:y1, x0:x1]], self.roi_size, (x0, y0))[0]
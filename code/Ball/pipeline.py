@@ -0,0 +1,156 @@
+import queue
+import threading
+import time
+
+from terrain.inference import batched
+from terrain.video_io import iter_frames
+
+_END = object()
+
+
+class StageStats:
+    """Temps d'activité et d'attente (contre-pression) d'un étage du pipeline"""
+
+    def __init__(self, name):
+        self.name = name
+        self.busy = 0.0
+        self.wait = 0.0
+        self.items = 0
+
+    def utilisation(self, elapsed):
+        return self.busy / elapsed if elapsed > 0 else 0.0
+
+
+class BallPipeline:
+    """
+    Pipeline décodage → inférence → écriture pour la détection de balle.
+
+    - Décodage : ``iter_frames`` décode la vidéo dans son thread, dans une
+      file bornée de ``queue_size`` lots, regroupés par ``batch_size`` frames.
+    - Inférence : le thread appelant itère sur ``batches()``.
+    - Écriture : ``submit(fn, *args)`` dépose une tâche (annotation, image,
+      ligne JSON) dans une file bornée, exécutée par un thread d'écriture.
+
+    Chaque étage a un seul thread et les files sont FIFO : l'ordre des frames
+    est conservé. Les files bornées assurent la contre-pression (un étage en
+    avance attend le suivant) et ``report()`` donne l'utilisation de chaque
+    étage pour identifier le goulot d'étranglement. Une erreur dans une
+    tâche d'écriture est remontée dès le lot ou la tâche suivante, ce qui
+    arrête le décodage. S'utilise comme gestionnaire de contexte.
+    """
+
+    def __init__(self, video_path, batch_size=8, queue_size=4):
+        self.video_path = video_path
+        self.batch_size = batch_size
+        self.stats = {name: StageStats(name) for name in ("decode", "infer", "write")}
+        self._frames = iter_frames(
+            video_path,
+            prefetch=max(1, queue_size) * batch_size,
+            stats=self.stats["decode"],
+        )
+        self._tasks = queue.Queue(maxsize=max(1, queue_size * batch_size))
+        self._errors = []
+        self._start = time.perf_counter()
+        self._elapsed = None
+        self._writer = threading.Thread(target=self._write, daemon=True)
+        self._writer.start()
+
+    def _raise_errors(self):
+        """Remonte la première erreur d'écriture dans le thread appelant"""
+        if self._errors:
+            raise self._errors[0]
+
+    def _write(self):
+        stats = self.stats["write"]
+        while True:
+            task = self._tasks.get()
+            if task is _END:
+                break
+            if self._errors:
+                continue
+            fn, args = task
+            start = time.perf_counter()
+            try:
+                fn(*args)
+            except Exception as exc:  # remonté au thread appelant
+                self._errors.append(exc)
+            stats.busy += time.perf_counter() - start
+            stats.items += 1
+
+    def batches(self):
+        """
+        Lots de frames décodées, dans l'ordre.
+
+        Le temps passé par l'appelant entre deux lots (hors attente dans
+        ``submit``) est compté comme temps d'inférence.
+        """
+        stats = self.stats["infer"]
+        frame_batches = batched(self._frames, self.batch_size)
+        while True:
+            self._raise_errors()
+            start = time.perf_counter()
+            batch = next(frame_batches, None)
+            stats.wait += time.perf_counter() - start
+            if batch is None:
+                return
+            wait_before = stats.wait
+            start = time.perf_counter()
+            yield batch
+            stats.busy += time.perf_counter() - start - (stats.wait - wait_before)
+            stats.items += len(batch)
+
+    def submit(self, fn, *args):
+        """Exécute ``fn(*args)`` dans le thread d'écriture, après les tâches précédentes"""
+        self._raise_errors()
+        stats = self.stats["infer"]
+        start = time.perf_counter()
+        # put avec timeout pour remonter une erreur d'écriture sans attendre
+        while True:
+            self._raise_errors()
+            try:
+                self._tasks.put((fn, args), timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        stats.wait += time.perf_counter() - start
+
+    def close(self):
+        """Arrête le décodage, attend la fin des écritures et remonte les erreurs"""
+        if self._elapsed is None:
+            self._frames.close()
+            self._tasks.put(_END)
+            self._writer.join()
+            self._elapsed = time.perf_counter() - self._start
+        self._raise_errors()
+
+    def report(self):
+        """
+        Affiche et renvoie l'utilisation de chaque étage (part du temps total
+        passée à travailler) ; l'étage le plus utilisé est le goulot.
+        """
+        elapsed = self._elapsed or time.perf_counter() - self._start
+        report = {
+            name: {
+                "busy_s": round(stats.busy, 3),
+                "wait_s": round(stats.wait, 3),
+                "items": stats.items,
+                "utilisation": round(stats.utilisation(elapsed), 3),
+            }
+            for name, stats in self.stats.items()
+        }
+        bottleneck = max(report, key=lambda name: report[name]["utilisation"])
+        print(f"[Pipeline] Durée totale : {elapsed:.2f} s")
+        for name, stage in report.items():
+            print(
+                f"[Pipeline] {name:6} : utilisation {stage['utilisation']:6.1%}, "
+                f"actif {stage['busy_s']:.2f} s, attente {stage['wait_s']:.2f} s, "
+                f"{stage['items']} éléments"
+            )
+        print(f"[Pipeline] Goulot d'étranglement : {bottleneck}")
+        return report
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
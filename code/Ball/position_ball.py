@@ -2,24 +2,204 @@ import cv2
 from ultralytics import YOLO
 import os
 import time
-import json
 import glob
-import math
+import numpy as np
 
-def ball(output_dir, video_path, model_path):
-    output_jsonl = os.path.join(output_dir, "balle.jsonl")
+from Ball.court_roi import CourtRoi
+from Ball.kalman import KalmanRoiSearch
+from Ball.pipeline import BallPipeline
+from Ball.tracker import BallTracker
+from Ball.trajectory import TrajectoryWriter, export_jsonl
+
+
+def best_detections(results, roi=None, offset=(0, 0)):
+    """
+    Meilleure boîte (confiance maximale) de chaque frame d'un lot.
+
+    Args:
+        results: Résultats YOLO d'un appel à ``predict`` sur un lot de frames
+        roi: ``CourtRoi`` optionnel, les boîtes hors de la région sont ignorées
+        offset: Position (x, y) dans la frame des images passées à YOLO (crops)
+
+    Returns:
+        list: (x, y, confiance) du centre de la meilleure boîte, ou None
+    """
+    best = []
+    for result in results:
+        boxes = result.boxes
+        if len(boxes) == 0:
+            best.append(None)
+            continue
+        conf = boxes.conf.cpu().numpy()
+        centers = boxes.xywh[:, :2].cpu().numpy() + offset
+        if roi is not None:
+            conf = np.where(roi.contains(centers[:, 0], centers[:, 1]), conf, -1.0)
+        i = int(conf.argmax())
+        if conf[i] < 0:
+            best.append(None)
+            continue
+        best.append((float(centers[i, 0]), float(centers[i, 1]), float(conf[i])))
+    return best
+
+
+FRAME_OUTPUTS = ("none", "video", "crops", "png")
+
+
+class DetectionWriter:
+    """
+    Écrit la trajectoire de la balle (``TrajectoryWriter``) et la sortie image
+    choisie par ``mode`` ; utilisé depuis le thread d'écriture du pipeline
+    (encodage hors inférence).
+
+    - ``"none"`` : uniquement la trajectoire
+    - ``"video"`` : une vidéo MP4 annotée ``balle_annotee.mp4`` (toutes les frames)
+    - ``"crops"`` : un JPEG ``crop_<frame>.jpg`` de ``crop_size`` pixels autour de la balle
+    - ``"png"`` : (débogage) la frame annotée ``detection_<frame>.png`` en pleine résolution
+    """
+
+    def __init__(
+        self,
+        trajectory,
+        output_dir,
+        mode="none",
+        fps=30,
+        size=None,
+        crop_size=128,
+        jpeg_quality=90,
+    ):
+        if mode not in FRAME_OUTPUTS:
+            raise ValueError(f"Mode de sortie inconnu : {mode}")
+        self.trajectory = trajectory
+        self.output_dir = output_dir
+        self.mode = mode
+        self.crop_size = crop_size
+        self.jpeg_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.video = None
+        if mode == "video":
+            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+            path = os.path.join(output_dir, "balle_annotee.mp4")
+            self.video = cv2.VideoWriter(path, fourcc, fps, size)
+
+    @staticmethod
+    def annotate(frame, point):
+        # Annoter la position détectée (en jaune si interpolée)
+        x, y = int(point["x"]), int(point["y"])
+        color = (0, 255, 255) if point["interpolated"] else (0, 0, 255)
+        label = f"Balle ({point['confidence']:.2f})"
+        if point["interpolated"]:
+            label = "Balle (interp.)"
+        cv2.circle(frame, (x, y), 5, color, -1)
+        cv2.putText(
+            frame,
+            label,
+            (x, y - 10),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (0, 255, 0),
+            2,
+        )
+
+    def write(self, frame, frame_no, point):
+        """Enregistre la frame ``frame_no`` ; ``point`` est la position suivie ou None"""
+        if self.mode == "video":
+            if point:
+                self.annotate(frame, point)
+            self.video.write(frame)
+        elif self.mode == "crops" and point:
+            h, w = frame.shape[:2]
+            half = self.crop_size // 2
+            x0 = min(max(int(point["x"]) - half, 0), max(w - self.crop_size, 0))
+            y0 = min(max(int(point["y"]) - half, 0), max(h - self.crop_size, 0))
+            crop = frame[y0 : y0 + self.crop_size, x0 : x0 + self.crop_size]
+            output_image_path = os.path.join(self.output_dir, f"crop_{frame_no}.jpg")
+            cv2.imwrite(output_image_path, crop, self.jpeg_params)
+        elif self.mode == "png" and point:
+            self.annotate(frame, point)
+            output_image_path = os.path.join(
+                self.output_dir, f"detection_{frame_no}.png"
+            )
+            cv2.imwrite(output_image_path, frame)
+
+        self.trajectory.append(frame_no, point)
+
+    def close(self):
+        self.trajectory.close()
+        if self.video is not None:
+            self.video.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
-    # Supprimer l'ancien fichier JSONL s'il existe
-    if os.path.exists(output_jsonl):
-        os.remove(output_jsonl)
+
+def ball(
+    output_dir,
+    video_path,
+    model_path,
+    batch_size=8,
+    frame_output="none",
+    roi_tracking=False,
+    roi_size=320,
+    max_misses=5,
+    full_frame_interval=30,
+    distance_max=200,
+    max_gap=5,
+    jsonl=False,
+    terrain_json=None,
+    court_roi="mask",
+    court_margin=100,
+    on_position=None,
+):
+    """
+    Détecte la balle sur toute la vidéo et écrit la trajectoire
+    ``balle.npy`` (+ en-tête ``balle.json``, voir ``Ball.trajectory``).
+
+    Les frames sont passées à YOLO par lots de ``batch_size`` ; les
+    détections sont ensuite suivies frame par frame, dans l'ordre, par un
+    ``BallTracker`` : filtrage autour de la position prédite (``distance_max``
+    pixels), réacquisition après une détection aberrante et interpolation des
+    trous d'au plus ``max_gap`` frames (drapeau ``INTERPOLATED``). Le
+    décodage et les écritures tournent dans leurs propres threads
+    (``BallPipeline``), qui affiche à la fin l'utilisation de chaque étage.
+
+    ``frame_output`` choisit la sortie image (voir ``DetectionWriter``) :
+    ``"none"``, ``"video"``, ``"crops"`` ou ``"png"`` (débogage). Avec
+    ``jsonl``, la trajectoire est aussi exportée au format ``balle.jsonl``.
+
+    Avec ``roi_tracking``, YOLO ne tourne (frame par frame) que sur une
+    fenêtre de ``roi_size`` pixels autour de la position prédite par un
+    filtre de Kalman à accélération constante (``KalmanRoiSearch``), avec un
+    retour à la frame entière après ``max_misses`` frames sans balle et
+    toutes les ``full_frame_interval`` frames.
+
+    Avec ``terrain_json`` (calibration de ``infer_terrain``), la recherche est
+    limitée au terrain projeté dans l'image et dilaté de ``court_margin``
+    pixels (``CourtRoi``) : ``court_roi="mask"`` ignore les détections hors
+    du masque, ``"crop"`` passe en plus à YOLO le seul rectangle englobant.
+
+    ``on_position(frame, x, y)`` est appelé dans le thread d'écriture pour
+    chaque position connue de la balle, dans l'ordre des frames et dès que
+    le suivi l'a finalisée (par exemple ``OnlineBounceDetector.push`` pour
+    détecter les rebonds pendant l'échange).
+    """
+    output_npy = os.path.join(output_dir, "balle.npy")
+    output_jsonl = os.path.join(output_dir, "balle.jsonl")
 
     # Création du dossier de sortie s’il n’existe pas
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    # Nettoyage des anciennes images
-    for file in glob.glob(os.path.join(output_dir, "detection_*.png")):
-        os.remove(file)
+    # Nettoyage des anciennes sorties
+    for pattern in (
+        "balle.jsonl",
+        "detection_*.png",
+        "crop_*.jpg",
+        "balle_annotee.mp4",
+    ):
+        for file in glob.glob(os.path.join(output_dir, pattern)):
+            os.remove(file)
 
     # Chargement du modèle
     model = YOLO(model_path)
@@ -32,90 +212,76 @@ def ball(output_dir, video_path, model_path):
 
     fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    size = (
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+    )
+    cap.release()
+
+    # Région du terrain, calculée une seule fois
+    roi = None
+    if terrain_json is not None:
+        roi = CourtRoi.from_terrain_json(terrain_json, size, court_margin)
+        if roi is None:
+            print("Terrain inexploitable : recherche sur la frame entière.")
+    crop_roi = roi if court_roi == "crop" else None
 
     frame_counter = 0
     start_time = time.time()
 
-    detection_buffer = []  # tampon pour stocker les dernières positions valides
-    distance_max = 200     # distance max autorisée entre deux détections consécutives
-
-    with open(output_jsonl, "a") as f_json:
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            frame_start_time = time.time()
-
-            # Détection directe sans retenter si rien détecté
-            results = model.predict(frame, conf=0.05, iou=0.15, verbose=False)
-            boxes = results[0].boxes
-
-            best_box = None
-            best_conf = 0
-            for box in boxes:
-                conf = box.conf.item()
-                if conf > best_conf:
-                    best_conf = conf
-                    best_box = box
-
-            detection_info = {
-                "frame": frame_counter,
-                "fps": fps,
-                "total_frames": total_frames,
-                "detections": [],
-                "no_detection": False
-            }
-
-            if best_box:
-                Ball_X, Ball_Y = (
-                    best_box.xywh[0][0].item(),
-                    best_box.xywh[0][1].item(),
-                )
-
-                detection_valid = True
-                if detection_buffer:
-                    last_x, last_y = detection_buffer[-1]
-                    dist = math.hypot(Ball_X - last_x, Ball_Y - last_y)
-                    if dist > distance_max:
-                        detection_valid = False  # trop éloigné de la précédente
-
-                if detection_valid:
-                    detection_buffer.append((Ball_X, Ball_Y))
-                    if len(detection_buffer) > 3:
-                        detection_buffer.pop(0)
-
-                    # Annoter la position détectée
-                    cv2.circle(frame, (int(Ball_X), int(Ball_Y)), 5, (0, 0, 255), -1)
-                    cv2.putText(
-                        frame,
-                        f"Balle ({best_conf:.2f})",
-                        (int(Ball_X), int(Ball_Y) - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.5,
-                        (0, 255, 0),
-                        2,
-                    )
-
-                    frame_processing_time = time.time() - frame_start_time
-
-                    detection_info["detections"].append({
-                        "Ball_X": int(Ball_X),
-                        "Ball_Y": int(Ball_Y),
-                        "confidence": best_conf,
-                        "temps_detection": frame_processing_time
-                    })
-
-                    output_image_path = os.path.join(output_dir, f"detection_{frame_counter}.png")
-                    cv2.imwrite(output_image_path, frame)
+    # Suivi de la balle (Kalman, réacquisition, interpolation des trous)
+    tracker = BallTracker(gate=distance_max, max_gap=max_gap)
+    search = (
+        KalmanRoiSearch(tracker, roi_size, max_misses, full_frame_interval)
+        if roi_tracking
+        else None
+    )
+
+    def detect(images, imgsz=None, offset=(0, 0)):
+        # Frames entières : crop au rectangle du terrain si demandé
+        if imgsz is None and crop_roi is not None:
+            images = [crop_roi.crop(img) for img in images]
+            offset = crop_roi.bbox[:2]
+        options = {"imgsz": imgsz} if imgsz else {}
+        results = model.predict(images, conf=0.05, iou=0.15, verbose=False, **options)
+        return best_detections(results, roi, offset)
+
+    def emit(tracked):
+        # Trajectoire et sortie image dans le thread d'écriture
+        for frame_no, point, frame in tracked:
+            pipeline.submit(writer.write, frame, frame_no, point)
+            if on_position is not None and point is not None:
+                pipeline.submit(on_position, frame_no, point["x"], point["y"])
+
+    trajectory = TrajectoryWriter(output_npy, fps, total_frames, size)
+    writer = DetectionWriter(trajectory, output_dir, frame_output, fps, size)
+    with writer, BallPipeline(video_path, batch_size) as pipeline:
+        for frames in pipeline.batches():
+            if search is None:
+                # Détection directe sans retenter si rien détecté, N frames par appel
+                best_boxes = detect(frames)
+
+            # Suivi dans l'ordre des frames
+            for i, frame in enumerate(frames):
+                if search is None:
+                    best = best_boxes[i]
                 else:
-                    detection_info["no_detection"] = True
-            else:
-                detection_info["no_detection"] = True
+                    # La fenêtre dépend de la position prédite par le suivi
+                    best = search.detect(frame, frame_counter, detect)
 
-            f_json.write(json.dumps(detection_info) + "\n")
-            frame_counter += 1
+                emit(tracker.update(frame_counter, best, frame))
+                frame_counter += 1
 
-    cap.release()
+        emit(tracker.flush())
+
+    if jsonl:
+        export_jsonl(output_npy, output_jsonl)
+
+    pipeline.report()
+    if search is not None:
+        print(
+            f"Recherche dans la fenêtre : {search.roi_searches} frames, "
+            f"frame entière : {search.full_searches} frames"
+        )
     total_processing_time = time.time() - start_time
     print(f"Traitement terminé en {total_processing_time:.2f} secondes.")
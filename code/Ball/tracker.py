@@ -0,0 +1,170 @@
+import math
+
+from Ball.kalman import ConstantAccelerationKalman
+
+
+class BallTracker:
+    """
+    Suivi de la balle frame par frame.
+
+    - Estimation d'état : filtre de Kalman à accélération constante ; une
+      détection n'est acceptée que si elle est à moins de
+      ``gate + gate_growth × frames manquées`` pixels de la prédiction.
+    - Confiance du suivi : moyenne glissante des frames avec balle acceptée.
+    - Réacquisition : ``reacquire_hits`` détections rejetées consécutives et
+      cohérentes entre elles remplacent le suivi courant (une détection
+      aberrante ne bloque plus la vraie balle) ; après ``max_misses`` frames
+      sans balle, le suivi est perdu et la détection suivante le relance.
+    - Interpolation : les trous d'au plus ``max_gap`` frames entre deux
+      positions acceptées sont comblés linéairement (``interpolated``).
+
+    Les frames sont renvoyées dans l'ordre, avec au plus ``max_gap`` frames
+    de retard (le temps de savoir si un trou sera comblé).
+    """
+
+    def __init__(
+        self,
+        gate=200.0,
+        gate_growth=50.0,
+        max_misses=10,
+        max_gap=5,
+        reacquire_hits=3,
+        smoothing=0.2,
+        **kalman,
+    ):
+        self.gate = gate
+        self.gate_growth = gate_growth
+        self.max_misses = max_misses
+        self.max_gap = max_gap
+        self.reacquire_hits = reacquire_hits
+        self.smoothing = smoothing
+        self.kalman = ConstantAccelerationKalman(**kalman)
+        self.misses = 0
+        self.confidence = 0.0
+        self._prediction = None
+        self._predicted = False
+        self._last = None  # dernière position acceptée (frame, x, y)
+        self._pending = []  # frames sans balle en attente : (frame, payload)
+        self._candidate = []  # détections rejetées consécutives et cohérentes
+
+    def predict(self):
+        """
+        Position prédite (x, y) pour la frame courante, ou None si la balle
+        n'est pas suivie. Appelée au plus une fois par frame avant ``update``.
+        """
+        if not self._predicted:
+            self._prediction = self.kalman.predict()
+            self._predicted = True
+        return self._prediction
+
+    def _point(self, x, y, confidence, interpolated=False):
+        return {
+            "x": x,
+            "y": y,
+            "confidence": confidence,
+            "track_confidence": round(self.confidence, 3),
+            "interpolated": interpolated,
+        }
+
+    def _flush_pending(self, upto=None):
+        """Renvoie sans balle les frames en attente (avant ``upto`` seulement)"""
+        out, keep = [], []
+        for f, payload in self._pending:
+            (keep if upto is not None and f >= upto else out).append((f, payload))
+        self._pending = keep
+        return [(f, None, payload) for f, payload in out]
+
+    def _fill_gap(self, frame_no, x, y):
+        """Comble (ou non) les frames en attente avant une position acceptée"""
+        if self._last is None or frame_no - self._last[0] - 1 > self.max_gap:
+            return self._flush_pending()
+        last_frame, last_x, last_y = self._last
+        out = []
+        for f, payload in self._pending:
+            t = (f - last_frame) / (frame_no - last_frame)
+            point = self._point(
+                last_x + t * (x - last_x), last_y + t * (y - last_y), 0.0, True
+            )
+            out.append((f, point, payload))
+        self._pending = []
+        return out
+
+    def _accept(self, frame_no, detection, payload):
+        x, y, conf = detection
+        self.misses = 0
+        self.confidence += self.smoothing * (1.0 - self.confidence)
+        out = self._fill_gap(frame_no, x, y)
+        self.kalman.update(x, y)
+        self._last = (frame_no, x, y)
+        self._candidate = []
+        out.append((frame_no, self._point(x, y, conf), payload))
+        return out
+
+    def _reacquire(self, frame_no, detection, payload):
+        """Relance le suivi sur les détections candidates"""
+        first = self._candidate[0][0]
+        out = self._flush_pending(upto=first)
+        self.kalman.reset()
+        self._last = None
+        candidates = {f: d for f, d in self._candidate}
+        pending, self._pending = self._pending, []
+        for f, p in pending:
+            if self._last is not None:
+                self.kalman.predict()
+            if f in candidates:
+                out.extend(self._accept(f, candidates[f], p))
+            else:
+                self._pending.append((f, p))
+        self.kalman.predict()
+        out.extend(self._accept(frame_no, detection, payload))
+        return out
+
+    def update(self, frame_no, detection, payload=None):
+        """
+        Intègre la détection (x, y, confiance) ou None de la frame ``frame_no``.
+
+        Returns:
+            list: frames finalisées (frame, point ou None, payload) dans
+            l'ordre ; point = {"x", "y", "confidence", "track_confidence",
+            "interpolated"}
+        """
+        prediction = self.predict()
+        self._predicted = False
+
+        if detection is not None:
+            if prediction is None:
+                return self._accept(frame_no, detection, payload)
+            gate = self.gate + self.gate_growth * self.misses
+            dist = math.hypot(
+                detection[0] - prediction[0], detection[1] - prediction[1]
+            )
+            if dist <= gate:
+                return self._accept(frame_no, detection, payload)
+
+            # Détection rejetée : candidate à une réacquisition
+            if self._candidate:
+                last_f, (last_x, last_y, _) = self._candidate[-1]
+                jump = math.hypot(detection[0] - last_x, detection[1] - last_y)
+                if last_f != frame_no - 1 or jump > self.gate:
+                    self._candidate = []
+            self._candidate.append((frame_no, detection))
+            if len(self._candidate) >= self.reacquire_hits:
+                return self._reacquire(frame_no, detection, payload)
+        else:
+            self._candidate = []
+
+        # Frame sans balle acceptée
+        self.misses += 1
+        self.confidence *= 1.0 - self.smoothing
+        self._pending.append((frame_no, payload))
+        if self.misses > self.max_misses:
+            # Balle perdue : la prédiction n'est plus fiable
+            self.kalman.reset()
+            self._last = None
+        if self._last is None or len(self._pending) > self.max_gap:
+            return self._flush_pending()
+        return []
+
+    def flush(self):
+        """Frames encore en attente en fin de vidéo (sans balle)"""
+        return self._flush_pending()
@@ -0,0 +1,309 @@
+import json
+import os
+
+import numpy as np
+
+# Une ligne par frame, triées par numéro de frame
+TRAJECTORY_DTYPE = np.dtype(
+    [
+        ("frame", np.int32),
+        ("x", np.float32),
+        ("y", np.float32),
+        ("confidence", np.float32),
+        ("track_confidence", np.float32),
+        ("flags", np.uint8),
+    ]
+)
+
+# Bits de la colonne ``flags``
+DETECTED = 1
+INTERPOLATED = 2
+
+
+def header_path(path):
+    """Chemin de l'en-tête JSON (métadonnées vidéo) d'une trajectoire ``.npy``"""
+    return os.path.splitext(path)[0] + ".json"
+
+
+class TrajectoryWriter:
+    """
+    Écrit la trajectoire de la balle en colonnes : un tableau structuré
+    ``.npy`` (``TRAJECTORY_DTYPE``, chargeable en mémoire mappée) et un
+    en-tête JSON avec les métadonnées de la vidéo (fps, nombre de frames,
+    taille). Les lignes sont accumulées par blocs puis écrites à ``close``.
+    """
+
+    def __init__(self, path, fps, total_frames, size=None, chunk_size=4096):
+        self.path = path
+        self.header = {
+            "fps": fps,
+            "total_frames": total_frames,
+            "width": size[0] if size else None,
+            "height": size[1] if size else None,
+        }
+        self._chunks = []
+        self._chunk = np.zeros(chunk_size, dtype=TRAJECTORY_DTYPE)
+        self._n = 0
+
+    def append(self, frame, point=None):
+        """
+        Ajoute la frame ``frame`` ; ``point`` est None (pas de balle) ou un
+        dict ``{"x", "y", "confidence", "track_confidence", "interpolated"}``.
+        """
+        if self._n == len(self._chunk):
+            self._chunks.append(self._chunk)
+            self._chunk = np.zeros(len(self._chunk), dtype=TRAJECTORY_DTYPE)
+            self._n = 0
+        row = self._chunk[self._n]
+        row["frame"] = frame
+        if point is None:
+            row["x"] = row["y"] = np.nan
+        else:
+            row["x"], row["y"] = point["x"], point["y"]
+            row["confidence"] = point["confidence"]
+            row["track_confidence"] = point.get("track_confidence", 0.0)
+            row["flags"] = INTERPOLATED if point.get("interpolated") else DETECTED
+        self._n += 1
+
+    def close(self):
+        data = np.concatenate(self._chunks + [self._chunk[: self._n]])
+        np.save(self.path, data)
+        with open(header_path(self.path), "w") as f:
+            json.dump(self.header, f, indent=4)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def load_trajectory(path, mmap=True):
+    """
+    Charge une trajectoire ``.npy`` et son en-tête.
+
+    Returns:
+        tuple: (tableau structuré ``TRAJECTORY_DTYPE``, en-tête dict)
+    """
+    data = np.load(path, mmap_mode="r" if mmap else None)
+    with open(header_path(path), "r") as f:
+        header = json.load(f)
+    return data, header
+
+
+def ball_positions(data, include_interpolated=True):
+    """
+    Frames où la balle est connue.
+
+    Returns:
+        tuple: (frames, xs, ys) en tableaux NumPy
+    """
+    flags = DETECTED | INTERPOLATED if include_interpolated else DETECTED
+    mask = (data["flags"] & flags) != 0
+    return data["frame"][mask], data["x"][mask], data["y"][mask]
+
+
+def _row(data, frame):
+    """
+    Indice de la ligne de la frame ``frame`` (None si absente) : les lignes
+    écrites par ``TrajectoryWriter`` commencent à 0 sans trou, la ligne
+    ``frame`` est donc lue directement ; recherche dichotomique sinon.
+    """
+    frames = data["frame"]
+    if 0 <= frame < len(frames) and frames[frame] == frame:
+        return frame
+    i = int(np.searchsorted(frames, frame))
+    if i == len(frames) or frames[i] != frame:
+        return None
+    return i
+
+
+def position_at(data, frame):
+    """Position (x, y) de la balle à la frame ``frame``, None si inconnue"""
+    i = _row(data, frame)
+    if i is None or data["flags"][i] == 0:
+        return None
+    return float(data["x"][i]), float(data["y"][i])
+
+
+def positions_between(data, start, stop):
+    """
+    Frames ``start`` à ``stop`` (exclue) où la balle est connue.
+
+    Returns:
+        tuple: (frames, xs, ys) en tableaux NumPy
+    """
+    frames = data["frame"]
+    lo, hi = np.searchsorted(frames, [start, stop])
+    return ball_positions(data[lo:hi])
+
+
+def jsonl_index_path(jsonl_path):
+    """Chemin de l'index (numéro de frame → position en octets) d'un ``.jsonl``"""
+    return jsonl_path + ".idx.npy"
+
+
+def build_jsonl_index(jsonl_path):
+    """
+    Construit l'index d'un ``balle.jsonl`` : tableau ``int64`` indexé par
+    numéro de frame donnant la position en octets de sa ligne (-1 si la
+    frame est absente). Il est sauvegardé à côté du fichier et reconstruit
+    seulement si le ``.jsonl`` est plus récent.
+    """
+    index_path = jsonl_index_path(jsonl_path)
+    jsonl_mtime = os.path.getmtime(jsonl_path)
+    if os.path.exists(index_path) and os.path.getmtime(index_path) >= jsonl_mtime:
+        return np.load(index_path)
+    frames, offsets = [], []
+    offset = 0
+    with open(jsonl_path, "rb") as f:
+        for line in f:
+            if line.strip():
+                frames.append(json.loads(line)["frame"])
+                offsets.append(offset)
+            offset += len(line)
+    index = np.full(max(frames, default=-1) + 1, -1, dtype=np.int64)
+    index[frames] = offsets
+    np.save(index_path, index)
+    return index
+
+
+class JsonlTrajectory:
+    """
+    Accès direct aux frames d'un ancien ``balle.jsonl`` via son index : seules
+    les lignes demandées sont lues et décodées.
+    """
+
+    def __init__(self, jsonl_path):
+        self.index = build_jsonl_index(jsonl_path)
+        self._file = open(jsonl_path, "rb")
+
+    def _record(self, frame):
+        if not 0 <= frame < len(self.index) or self.index[frame] < 0:
+            return None
+        self._file.seek(self.index[frame])
+        return json.loads(self._file.readline())
+
+    def position(self, frame):
+        item = self._record(frame)
+        if item is None or item.get("no_detection", True) or not item["detections"]:
+            return None
+        det = item["detections"][0]
+        return det["Ball_X"], det["Ball_Y"]
+
+    def positions(self, start, stop):
+        known = [
+            (f, p)
+            for f in range(max(start, 0), min(stop, len(self.index)))
+            if (p := self.position(f)) is not None
+        ]
+        frames = np.array([f for f, _ in known], dtype=np.int32)
+        xy = np.array([p for _, p in known], dtype=np.float32).reshape(-1, 2)
+        return frames, xy[:, 0], xy[:, 1]
+
+    def close(self):
+        self._file.close()
+
+
+class NpyTrajectory:
+    """Accès direct aux frames d'une trajectoire ``.npy`` (mémoire mappée)"""
+
+    def __init__(self, path):
+        self.data, self.header = load_trajectory(path)
+
+    def position(self, frame):
+        return position_at(self.data, frame)
+
+    def positions(self, start, stop):
+        return positions_between(self.data, start, stop)
+
+    def close(self):
+        pass
+
+
+_open_trajectories = {}
+
+
+def open_trajectory(path):
+    """
+    Ouvre une trajectoire (``.npy`` ou ``.jsonl``) pour des recherches par
+    frame : ``position(frame)`` en O(1), ``positions(start, stop)`` en
+    O(nombre de frames). L'objet est gardé en cache tant que le fichier
+    n'est pas modifié, pour vérifier de nombreux rebonds sans le relire.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    trajectory = _open_trajectories.get(key[0])
+    if trajectory is None or trajectory[0] != key:
+        if trajectory is not None:
+            trajectory[1].close()
+        cls = JsonlTrajectory if path.endswith(".jsonl") else NpyTrajectory
+        trajectory = _open_trajectories[key[0]] = (key, cls(path))
+    return trajectory[1]
+
+
+def load_position(path, frame):
+    """
+    Position (x, y) de la balle à la frame ``frame`` depuis une trajectoire
+    ``.npy`` ou un ancien ``balle.jsonl`` ; None si la balle n'est pas connue.
+    """
+    return open_trajectory(path).position(frame)
+
+
+def load_positions(path, start, stop):
+    """
+    Positions connues de la balle entre les frames ``start`` et ``stop``
+    (exclue), depuis une trajectoire ``.npy`` ou un ancien ``balle.jsonl``.
+
+    Returns:
+        tuple: (frames, xs, ys) en tableaux NumPy
+    """
+    return open_trajectory(path).positions(start, stop)
+
+
+def export_jsonl(path, jsonl_path):
+    """Exporte une trajectoire au format historique ``balle.jsonl``"""
+    data, header = load_trajectory(path)
+    with open(jsonl_path, "w") as f:
+        for row in data:
+            record = {
+                "frame": int(row["frame"]),
+                "fps": header["fps"],
+                "total_frames": header["total_frames"],
+                "detections": [],
+                "no_detection": bool(row["flags"] == 0),
+            }
+            if row["flags"]:
+                detection = {
+                    "Ball_X": int(row["x"]),
+                    "Ball_Y": int(row["y"]),
+                    "confidence": float(row["confidence"]),
+                    "track_confidence": float(row["track_confidence"]),
+                }
+                if row["flags"] & INTERPOLATED:
+                    detection["interpolated"] = True
+                record["detections"].append(detection)
+            f.write(json.dumps(record) + "\n")
+
+
+def import_jsonl(jsonl_path, path):
+    """Convertit un ancien ``balle.jsonl`` en trajectoire ``.npy``"""
+    writer = None
+    with open(jsonl_path, "r") as f:
+        for line in f:
+            item = json.loads(line)
+            if writer is None:
+                writer = TrajectoryWriter(path, item["fps"], item["total_frames"])
+            point = None
+            if not item["no_detection"] and item["detections"]:
+                det = item["detections"][0]
+                point = {
+                    "x": det["Ball_X"],
+                    "y": det["Ball_Y"],
+                    "confidence": det["confidence"],
+                    "track_confidence": det.get("track_confidence", 0.0),
+                    "interpolated": det.get("interpolated", False),
+                }
+            writer.append(item["frame"], point)
+    if writer is not None:
+        writer.close()
@@ -1,25 +1,30 @@
-from algo_v9 import detection_fautes
-import time
+# Lancer depuis code/ : python -m Fautes.big_main
+import os
+
+from Ball.trajectory import ball_positions, load_trajectory
+from Fautes.algo_v9 import detection_fautes
+from Rebond.online import OnlineBounceDetector
+
 # On récupère les 14 points calibrés au démarrage
-with open("court_points.json") as f:
+with open(os.path.join(os.path.dirname(__file__), "court_points.json")) as f:
     court_json = f.read()
 
 
-def Rebond():
-    time.sleep(1)
-    return True
-
-def get_last_ball_xy():
-    return 412.52, 205.46
+def positions_balle():
+    """Positions (frame, x, y) de la balle au fil de l'eau (ici rejouées depuis balle.npy)"""
+    data, _ = load_trajectory("output/balle/balle.npy")
+    frames, xs, ys = ball_positions(data)
+    yield from zip(frames.tolist(), xs.tolist(), ys.tolist())
 
 
-# Boucle principale (pseudocode) ------------------
-while True:
-    if Rebond():                         # votre moteur de détection de rebond
-        x, y = get_last_ball_xy()        # coordonnées du dernier rebond
-        joue = "bottom_player"           # ou "top_player"
-        good = detection_fautes(court_json, x, y, joue)
+# Boucle principale ------------------
+rebonds = OnlineBounceDetector(window_size=5)  # moteur de détection de rebond
+for frame, x, y in positions_balle():  # une position par frame suivie
+    rebond = rebonds.push(frame, x, y)  # émis window_size positions plus tard
+    if rebond:
+        joue = "bottom_player"  # ou "top_player"
+        good = detection_fautes(court_json, rebond["x"], rebond["y"], joue)
         if good:
-            print("Balle IN")
+            print(f"Frame {rebond['frame']} : Balle IN")
         else:
-            print("Faute !")
\ No newline at end of file
+            print(f"Frame {rebond['frame']} : Faute !")
@@ -0,0 +1,103 @@
+from collections import deque
+
+import numpy as np
+
+from Rebond.stats import rebound_mask
+
+
+class OnlineBounceDetector:
+    """
+    Détection des rebonds au fil des frames, avec les mêmes critères que
+    ``Rebond.stats.detect_rebounds`` (``Rebond.stats.rebound_mask``).
+
+    Les positions connues de la balle sont fournies une à une, dans l'ordre
+    (``push``). Seules les ``2 × window_size + 1`` dernières sont gardées :
+    comme dans ``detect_rebounds``, un point n'est évalué que lorsque
+    ``window_size`` positions le suivent, soit un retard de ``window_size``
+    positions. Sur une même trajectoire, les rebonds émis sont exactement
+    ceux de ``detect_rebounds``, y compris en fin de trajectoire.
+
+    Avec ``refine``, la position du rebond est affinée entre deux frames
+    (``Rebond.refine.refine_bounces``) sur les positions gardées :
+    ``window_size`` de chaque côté du point.
+    """
+
+    def __init__(
+        self,
+        window_size=5,
+        min_direction_change=4,
+        min_frames_between_rebounds=10,
+        on_bounce=None,
+        refine=False,
+    ):
+        self.window_size = window_size
+        self.min_direction_change = min_direction_change
+        self.min_frames_between_rebounds = min_frames_between_rebounds
+        self.on_bounce = on_bounce
+        self.refine = refine
+        self.last_rebound_frame = -float("inf")
+        self._samples = deque(maxlen=2 * window_size + 1)
+
+    def push(self, frame, x, y):
+        """
+        Ajoute la position (x, y) de la balle à la frame ``frame``.
+
+        Returns:
+            dict | None: rebond ``{"frame", "x", "y"}`` détecté au point situé
+            ``window_size`` positions plus tôt (``{"frame", "time", "x",
+            "y", "refined"}`` avec ``refine``), passé aussi à ``on_bounce``
+        """
+        self._samples.append((frame, x, y))
+        if len(self._samples) < self._samples.maxlen or self.window_size < 3:
+            return None
+
+        w = self.window_size
+        current_frame, current_x, current_y = self._samples[w]
+
+        # Vérifier qu'on est assez loin du dernier rebond
+        if current_frame - self.last_rebound_frame < self.min_frames_between_rebounds:
+            return None
+
+        ys = np.array([[s[2] for s in self._samples]])
+        if not rebound_mask(
+            ys[:, :w], ys[:, w : 2 * w], ys[:, w], self.min_direction_change
+        )[0]:
+            return None
+
+        self.last_rebound_frame = current_frame
+        bounce = {"frame": current_frame, "x": current_x, "y": current_y}
+        if self.refine:
+            from Rebond.refine import refine_bounces
+
+            frames, xs, ys = zip(*self._samples)
+            bounce = refine_bounces(frames, xs, ys, [bounce], w)[0]
+        if self.on_bounce is not None:
+            self.on_bounce(bounce)
+        return bounce
+
+    def reset(self):
+        """Oublie les positions en attente (nouvel échange, balle perdue)"""
+        self._samples.clear()
+        self.last_rebound_frame = -float("inf")
+
+
+if __name__ == "__main__":
+    # Démonstration : rebonds émis au fil d'une trajectoire enregistrée
+    # (depuis code/ : python -m Rebond.online)
+    import os
+
+    from Ball.trajectory import ball_positions, load_trajectory
+    from Rebond.stats import detect_rebounds
+
+    path = os.path.join(os.path.dirname(__file__), "..", "output", "balle", "balle.npy")
+    data, _ = load_trajectory(path)
+    frames, xs, ys = ball_positions(data)
+
+    detector = OnlineBounceDetector(
+        on_bounce=lambda b: print(f"Rebond frame {b['frame']}: x={b['x']}, y={b['y']}")
+    )
+    for frame, x, y in zip(frames.tolist(), xs.tolist(), ys.tolist()):
+        detector.push(frame, x, y)
+
+    offline = detect_rebounds(frames.tolist(), ys.tolist())
+    print(f"Rebonds hors ligne (detect_rebounds) : {len(offline)}")
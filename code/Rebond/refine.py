@@ -0,0 +1,187 @@
+import numpy as np
+
+
+def _apply_homography(matrix, xs, ys):
+    """Applique une homographie 3x3 à des tableaux de coordonnées de même forme"""
+    pts = np.stack([xs, ys, np.ones_like(xs)], axis=-1) @ matrix.T
+    return pts[..., 0] / pts[..., 2], pts[..., 1] / pts[..., 2]
+
+
+def court_homography(terrain_json_path, frame=0):
+    """
+    Homographie terrain de référence → image en vigueur à la frame ``frame``
+    (calibration unique ou ``CourtTimeline``), None si elle n'est pas
+    calculable ; à passer à ``refine_bounces`` pour ajuster dans le plan du
+    terrain.
+    """
+    import json
+
+    from terrain.homography import get_trans_matrix
+    from terrain.timeline import court_json_for_frame
+
+    court = json.loads(court_json_for_frame(terrain_json_path, frame))
+    points = [(p["x"], p["y"]) if p else None for p in court["points"]]
+    return get_trans_matrix(points)
+
+
+def _fit_quadratics(ts, values):
+    """
+    Moindres carrés en lot : un polynôme de degré 2 en ``t`` par segment et
+    par coordonnée.
+
+    Args:
+        ts: Tableau (B, N) des instants
+        values: Tableau (B, N, 2) des coordonnées
+
+    Returns:
+        np.ndarray: Coefficients (B, 3, 2) de (t², t, 1)
+    """
+    vander = np.stack([ts**2, ts, np.ones_like(ts)], axis=-1)
+    return np.linalg.pinv(vander) @ values
+
+
+def _evaluate(coeffs, ts):
+    """Valeurs (B, T, 2) des polynômes (B, 3, 2) aux instants ``ts`` (B, T)"""
+    vander = np.stack([ts**2, ts, np.ones_like(ts)], axis=-1)
+    return vander @ coeffs
+
+
+def refine_bounces(
+    frames, xs, ys, bounces, window_size=5, homography=None, resolution=0.01
+):
+    """
+    Localise les rebonds entre deux frames par ajustement de paraboles.
+
+    Pour chaque rebond détecté au point i, les positions i - window_size à
+    i + window_size sont séparées en deux arcs, avant et après le rebond,
+    ajustés chacun par une parabole en fonction du temps (x(t) et y(t),
+    moindres carrés, tous les rebonds en une fois). Le rebond étant souvent
+    signalé une frame trop tôt, la séparation entre les points c et c + 1
+    est essayée pour c de i - 2 à i + 1 ; l'instant du rebond est celui où
+    les deux arcs se rejoignent : le minimum de la distance entre les arcs
+    entre les frames c - 1 et c + 2, cherché au pas ``resolution`` (en
+    frames) ; la position est le milieu des deux arcs à cet instant. Un
+    minimum au bord de l'intervalle n'est pas une jonction ; parmi les
+    séparations restantes, celle dont les arcs s'ajustent le mieux (résidu
+    des moindres carrés) est retenue.
+
+    Avec ``homography`` (terrain de référence → image, voir
+    ``court_homography``), les positions sont d'abord ramenées dans le plan
+    du terrain et l'ajustement s'y fait ; le point obtenu est reprojeté dans
+    l'image pour ``detection_fautes``.
+
+    Args:
+        frames, xs, ys: Positions connues de la balle (``ball_positions``)
+        bounces: Rebonds détectés (``detect_rebounds`` ou
+            ``OnlineBounceDetector``), avec la clé ``"frame"``
+        window_size: Nombre de positions ajustées de chaque côté (≥ 3)
+
+    Returns:
+        List[dict]: Par rebond ``{"frame", "time", "x", "y", "refined"}`` ;
+        ``time`` est l'instant du rebond en frames (fractionnaire). Sans
+        assez de positions autour du rebond, ou sans jonction des arcs dans
+        l'intervalle de recherche, la position détectée est gardée
+        (``refined`` à False). Avec ``homography``, ``court_x`` et
+        ``court_y`` donnent le point dans le plan du terrain.
+    """
+    frames = np.asarray(frames, dtype=np.float64)
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    n = len(frames)
+    w = window_size
+
+    bounce_frames = np.array([b["frame"] for b in bounces], dtype=np.float64)
+    idx = np.searchsorted(frames, bounce_frames)
+    raw = np.minimum(idx, max(n - 1, 0))
+    found = (frames[raw] == bounce_frames) if n else np.zeros(len(idx), dtype=bool)
+    ok = found & (idx >= w) & (idx + w < n) & (w >= 3)
+
+    # Par défaut (pas assez de positions autour) : position détectée
+    refined = [
+        {
+            "frame": b["frame"],
+            "time": float(b["frame"]),
+            "x": b["x"] if "x" in b else (float(xs[raw[k]]) if found[k] else None),
+            "y": b["y"],
+            "refined": False,
+        }
+        for k, b in enumerate(bounces)
+    ]
+
+    if homography is not None:
+        xs, ys = _apply_homography(np.linalg.inv(homography), xs, ys)
+
+    sel = np.flatnonzero(ok)
+    if len(sel) == 0:
+        return refined
+
+    # Le rebond peut être signalé une frame trop tôt ou trop tard : les
+    # positions i - w à i + w sont séparées en deux arcs entre les points c
+    # et c + 1, pour c de i - 2 à i + 1, avec au moins 3 positions par arc
+    centre = idx[sel]
+    t0 = frames[centre][:, None]
+    points = np.stack([xs, ys], axis=-1)
+    steps = np.linspace(0.0, 1.0, int(round(1.0 / resolution)) + 1)
+    rows = np.arange(len(sel))
+    best_residual = np.full(len(sel), np.inf)
+    t_best = np.zeros(len(sel))
+    bounce_xy = np.full((len(sel), 2), np.nan)
+    for shift in (-2, -1, 0, 1):
+        if min(w + 1 + shift, w - shift) < 3:
+            continue
+        # Segments avant (i - w à c) et après (c + 1 à i + w), temps centré
+        # sur la frame du point i
+        split = centre + shift
+        before = centre[:, None] + np.arange(-w, shift + 1)
+        after = centre[:, None] + np.arange(shift + 1, w + 1)
+        coeffs_in = _fit_quadratics(frames[before] - t0, points[before])
+        coeffs_out = _fit_quadratics(frames[after] - t0, points[after])
+        # Résidu des moindres carrés (les mêmes 2w + 1 positions pour chaque
+        # c) : un point de l'autre arc dans un segment le fait grimper
+        residual = sum(
+            ((_evaluate(coeffs, frames[seg] - t0) - points[seg]) ** 2).sum(axis=(1, 2))
+            for coeffs, seg in ((coeffs_in, before), (coeffs_out, after))
+        )
+
+        # Jonction des arcs autour de l'intervalle [c, c + 1], à une frame
+        # près (rebond sur une frame connue)
+        lo = frames[split - 1] - t0[:, 0]
+        hi = frames[split + 2] - t0[:, 0]
+        grid = lo[:, None] + (hi - lo)[:, None] * steps
+        arc_in = _evaluate(coeffs_in, grid)
+        arc_out = _evaluate(coeffs_out, grid)
+        gap = np.linalg.norm(arc_in - arc_out, axis=-1)
+        best = np.argmin(gap, axis=1)
+        xy = 0.5 * (arc_in[rows, best] + arc_out[rows, best])
+
+        # Un minimum au bord de l'intervalle n'est pas une jonction : les arcs
+        # se rejoignent ailleurs (autre séparation) ou pas du tout. Parmi les
+        # séparations restantes, celle dont les arcs s'ajustent le mieux
+        keep = (
+            (best > 0)
+            & (best < len(steps) - 1)
+            & np.isfinite(xy).all(axis=1)
+            & (residual < best_residual)
+        )
+        best_residual[keep] = residual[keep]
+        t_best[keep] = grid[rows, best][keep]
+        bounce_xy[keep] = xy[keep]
+    joined = np.isfinite(best_residual)
+
+    image_x, image_y = bounce_xy[:, 0], bounce_xy[:, 1]
+    if homography is not None:
+        image_x, image_y = _apply_homography(homography, image_x, image_y)
+
+    for j, k in enumerate(sel):
+        if not joined[j]:
+            continue
+        refined[k].update(
+            time=float(t0[j, 0] + t_best[j]),
+            x=float(image_x[j]),
+            y=float(image_y[j]),
+            refined=True,
+        )
+        if homography is not None:
+            refined[k]["court_x"] = float(bounce_xy[j, 0])
+            refined[k]["court_y"] = float(bounce_xy[j, 1])
+    return refined
@@ -1,23 +1,33 @@
 import json
 import os
 
-import plotly.graph_objects as go
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 
-def load_ball_data(jsonl_path):
+def load_ball_data(path):
     """
-    Charge les données de la balle depuis un fichier JSONL.
+    Charge les données de la balle depuis une trajectoire ``balle.npy`` (ou
+    un ancien fichier JSONL).
 
     Args:
-        jsonl_path: Chemin vers le fichier JSONL contenant les données de la balle
+        path: Chemin vers la trajectoire de la balle
 
     Returns:
-        tuple: (frames, ys) - listes des numéros de frames et des positions Y
+        tuple: (frames, ys) - numéros de frames et positions Y où la balle est
+        connue (tableaux NumPy pour une trajectoire, listes pour un JSONL)
     """
+    if not path.endswith(".jsonl"):
+        from Ball.trajectory import ball_positions, load_trajectory
+
+        data, _ = load_trajectory(path)
+        frames, _, ys = ball_positions(data)
+        return frames, ys
+
     frames = []
     ys = []
 
-    with open(jsonl_path, "r") as f:
+    with open(path, "r") as f:
         for line in f:
             data = json.loads(line)
             if not data["no_detection"] and data["detections"]:
@@ -27,6 +37,61 @@ def load_ball_data(jsonl_path):
     return frames, ys
 
 
+# Critères d'un rebond (positions Y en pixels)
+MIN_REBOUND_Y = 160  # la balle est assez bas dans l'image
+MAX_STEP = 50  # déplacement maximal entre deux positions consécutives
+MIN_TOTAL_CHANGE = 8  # variation totale minimale avant + après
+
+
+def rebound_mask(pre, post, y, min_direction_change=4):
+    """
+    Critères d'un rebond, communs à ``detect_rebounds`` et à
+    ``Rebond.online.OnlineBounceDetector``.
+
+    Args:
+        pre: Tableau (B, w) des positions Y avant chaque point (i - w à i - 1)
+        post: Tableau (B, w) des positions Y à partir du point (i à i + w - 1)
+        y: Tableau (B,) des positions Y des points
+        min_direction_change: Changement minimum de direction pour considérer un rebond
+
+    Returns:
+        np.ndarray: Tableau (B,) de booléens, True pour les rebonds
+    """
+    pre_diffs = pre[:, :-1] - pre[:, 1:]
+    post_diffs = post[:, :-1] - post[:, 1:]
+    k = pre_diffs.shape[1]
+
+    # Calcul des tendances (descente/montée) avec plus de poids sur les points
+    # proches ; somme accumulée terme à terme, dans le même ordre pour tous
+    # les appelants
+    pre_direction = 0
+    post_direction = 0
+    for j in range(k):
+        pre_direction = pre_direction + pre_diffs[:, j] * (j + 1)
+        post_direction = post_direction + post_diffs[:, j] * (k - j)
+
+    # Calculer la variation totale de position
+    total_pre_change = np.abs(pre[:, -1] - pre[:, 0])
+    total_post_change = np.abs(post[:, -1] - post[:, 0])
+
+    # Les changements sont relativement continus
+    max_step = np.maximum(np.abs(pre_diffs).max(axis=1), np.abs(post_diffs).max(axis=1))
+
+    return (
+        # La tendance générale montre une descente puis une montée
+        (pre_direction < 0)
+        & (post_direction > 0)
+        # Le changement de direction est suffisant
+        & (total_pre_change > min_direction_change)
+        & (total_post_change > min_direction_change)
+        # La position Y est cohérente avec un rebond
+        & (y > MIN_REBOUND_Y)
+        & (max_step < MAX_STEP)
+        # Le changement total est significatif
+        & (total_pre_change + total_post_change > MIN_TOTAL_CHANGE)
+    )
+
+
 def detect_rebounds(
     frames, ys, window_size=5, min_direction_change=4, min_frames_between_rebounds=10
 ):
@@ -46,92 +111,115 @@ def detect_rebounds(
     """
     rebounds = []
     last_rebound_frame = -float("inf")
+    n = len(frames)
+    w = window_size
 
-    # On a besoin d'au moins window_size * 2 points pour détecter un rebond
-    if len(frames) < window_size * 2:
+    # On a besoin d'au moins window_size * 2 points pour détecter un rebond,
+    # et d'au moins 3 points consécutifs avant et après chaque point
+    if n < w * 2 or w < 3:
         return rebounds
 
-    # Analyse de chaque point de la trajectoire
-    for i in range(window_size, len(frames) - window_size):
-        current_frame = frames[i]
+    # Points analysés : i de window_size à n - window_size (exclu).
+    # Avant le point : ys[i - w : i], après : ys[i : i + w]
+    y = np.asarray(ys)
+    idx = np.arange(w, n - w)
+    # windows[k] = ys[k : k + w] ; avant i : windows[i - w], après : windows[i]
+    windows = sliding_window_view(y, w)
+    candidates = rebound_mask(
+        windows[idx - w], windows[idx], y[idx], min_direction_change
+    )
 
-        # Vérifier qu'on est assez loin du dernier rebond
+    # Vérifier qu'on est assez loin du dernier rebond retenu
+    for i in idx[candidates].tolist():
+        current_frame = frames[i]
         if current_frame - last_rebound_frame < min_frames_between_rebounds:
             continue
+        rebounds.append({"frame": current_frame, "y": ys[i]})
+        last_rebound_frame = current_frame
 
-        # Extraction des trajectoires avant et après le point
-        pre_trajectory = ys[i - window_size : i]
-        post_trajectory = ys[i : i + window_size]
-
-        # S'assurer qu'on a assez de points consécutifs
-        if len(pre_trajectory) < 3 or len(post_trajectory) < 3:
-            continue
+    return rebounds
 
-        # Calcul des tendances (descente/montée) avec plus de poids sur les points proches
-        pre_diffs = [y1 - y2 for y1, y2 in zip(pre_trajectory[:-1], pre_trajectory[1:])]
-        post_diffs = [
-            y1 - y2 for y1, y2 in zip(post_trajectory[:-1], post_trajectory[1:])
-        ]
 
-        pre_direction = sum(diff * (idx + 1) for idx, diff in enumerate(pre_diffs))
-        post_direction = sum(
-            diff * (len(post_diffs) - idx) for idx, diff in enumerate(post_diffs)
-        )
-
-        # Calculer la variation totale de position
-        total_pre_change = pre_trajectory[-1] - pre_trajectory[0]
-        total_post_change = post_trajectory[-1] - post_trajectory[0]
-
-        # Détecter un rebond avec des critères plus flexibles
-        if (
-            # La tendance générale montre une descente puis une montée
-            pre_direction < 0
-            and post_direction > 0
-            # Le changement de direction est suffisant
-            and abs(total_pre_change) > min_direction_change
-            and abs(total_post_change) > min_direction_change
-            # La position Y est cohérente avec un rebond
-            and ys[i] > 160
-            # Les changements sont relativement continus
-            and all(abs(d) < 50 for d in pre_diffs + post_diffs)
-            # Le changement total est significatif
-            and abs(total_pre_change) + abs(total_post_change) > 8
-        ):
-            rebounds.append({"frame": current_frame, "y": ys[i]})
-            last_rebound_frame = current_frame
+def decimate_minmax(frames, ys, max_points, keep_frames=()):
+    """
+    Sous-échantillonnage pour l'affichage : la trajectoire est découpée en
+    ``max_points // 2`` tranches dont on garde le minimum et le maximum (les
+    pics et les creux restent visibles), plus les frames de ``keep_frames``
+    (les rebonds).
 
-    return rebounds
+    Returns:
+        np.ndarray: Indices triés des points gardés
+    """
+    ys = np.asarray(ys, dtype=np.float64)
+    n = len(ys)
+    buckets = max(max_points // 2, 1)
+    if n <= max_points:
+        return np.arange(n)
+
+    size = -(-n // buckets)
+    buckets = -(-n // size)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = ys
+    padded = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    keep = np.concatenate(
+        [
+            offsets + np.nanargmin(padded, axis=1),
+            offsets + np.nanargmax(padded, axis=1),
+            np.flatnonzero(np.isin(frames, keep_frames)),
+        ]
+    )
+    return np.unique(keep)
 
 
-def plot_rebounds(frames, ys, rebounds):
+def plot_rebounds(frames, ys, rebounds, max_points=20000, output_path=None):
     """
     Génère un graphique interactif montrant la trajectoire de la balle et les rebonds détectés.
 
+    Au-delà de ``max_points`` points (match complet), la trajectoire est
+    réduite par ``decimate_minmax`` en gardant tous les rebonds et tracée en
+    WebGL (``Scattergl``). plotly.js n'est pas inclus dans le HTML mais écrit
+    une seule fois (``plotly.min.js``) dans le dossier du graphique.
+
     Args:
         frames: Liste des numéros de frames
         ys: Liste des positions Y
         rebounds: Liste des rebonds détectés
+        max_points: Nombre maximal de points de trajectoire affichés
+        output_path: Fichier HTML (``rebounds_plot.html`` à côté du module par défaut)
     """
+    import plotly.graph_objects as go
+
+    rebound_frames = [r["frame"] for r in rebounds]
+    rebound_ys = [r["y"] for r in rebounds]
+
+    # Réduction de la trajectoire pour l'affichage
+    frames = np.asarray(frames)
+    ys = np.asarray(ys)
+    decimated = len(frames) > max_points
+    if decimated:
+        keep = decimate_minmax(frames, ys, max_points, rebound_frames)
+        frames, ys = frames[keep], ys[keep]
+
     # Création de la figure
     fig = go.Figure()
 
-    # Ajouter la trajectoire de la balle avec des lignes et des points
+    # Ajouter la trajectoire de la balle avec des lignes (et des points si
+    # la trajectoire est complète)
     fig.add_trace(
-        go.Scatter(
+        go.Scattergl(
             x=frames,
             y=ys,
-            mode="lines+markers",
-            name="Trajectoire",
+            mode="lines" if decimated else "lines+markers",
+            name="Trajectoire (réduite)" if decimated else "Trajectoire",
             line=dict(color="blue", width=1),
             marker=dict(size=4, color="blue", opacity=0.5),
         )
     )
 
     # Ajouter les rebonds
-    rebound_frames = [r["frame"] for r in rebounds]
-    rebound_ys = [r["y"] for r in rebounds]
     fig.add_trace(
-        go.Scatter(
+        go.Scattergl(
             x=rebound_frames,
             y=rebound_ys,
             mode="markers",
@@ -154,18 +242,20 @@ def plot_rebounds(frames, ys, rebounds):
     fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor="LightGrey")
     fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor="LightGrey")
 
-    # Sauvegarder en HTML
-    output_dir = os.path.dirname(__file__)
-    fig.write_html(os.path.join(output_dir, "rebounds_plot.html"))
+    # Sauvegarder en HTML, plotly.js chargé depuis le dossier du fichier
+    if output_path is None:
+        output_path = os.path.join(os.path.dirname(__file__), "rebounds_plot.html")
+    fig.write_html(output_path, include_plotlyjs="directory")
 
 
 def main():
     """
     Fonction principale pour tester la détection des rebonds
+    (depuis code/ : python -m Rebond.stats)
     """
     # Chemin vers le fichier de données
     data_path = os.path.join(
-        os.path.dirname(__file__), "..", "output", "balle", "balle.jsonl"
+        os.path.dirname(__file__), "..", "output", "balle", "balle.npy"
     )
 
     # Charger les données de la balle
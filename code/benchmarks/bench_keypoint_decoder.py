@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# bench_keypoint_decoder.py : Compare le décodage des points du terrain par
+# barycentre (decode_heatmaps) et par cercles de Hough (postprocess)
+# Lancer depuis code/ : python -m benchmarks.bench_keypoint_decoder
+
+import argparse
+import time
+
+import numpy as np
+
+from terrain.postprocess import decode_heatmaps, postprocess
+
+HEIGHT, WIDTH = 360, 640
+
+
+def synthetic_heatmaps(n, radius, sharpness, seed=0):
+    """
+    Taches de ``radius`` pixels (heatmap 640x360) à des positions sub-pixel.
+    Une ``sharpness`` élevée donne un plateau saturé à 1 comme la sortie
+    sigmoïde du modèle ; une faible, une tache en cloche.
+
+    Returns:
+        tuple: (heatmaps (n, H, W) float32, positions vraies (n, 2) dans l'image)
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.uniform([40, 40], [WIDTH - 40, HEIGHT - 40], size=(n, 2))
+    yy, xx = np.mgrid[0:HEIGHT, 0:WIDTH]
+    heatmaps = np.empty((n, HEIGHT, WIDTH), dtype=np.float32)
+    for k, (cx, cy) in enumerate(centres):
+        d = np.hypot(xx - cx, yy - cy)
+        logits = np.clip((radius - d) * sharpness, -60, 60)
+        heatmaps[k] = 1 / (1 + np.exp(-logits))
+    return heatmaps, centres * 2
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def errors(xy, truth):
+    return np.hypot(*(xy - truth).T)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du décodage des points")
+    parser.add_argument("--points", type=int, default=50, help="Taches par cas")
+    args = parser.parse_args()
+
+    print("Tache                      barycentre (moy/max)   Hough (moy/max)")
+    for radius in (5, 8, 12):
+        for sharpness, label in ((20.0, "saturée"), (0.5, "en cloche")):
+            heatmaps, truth = synthetic_heatmaps(args.points, radius, sharpness)
+            t_argmax, (xy, _) = timed(lambda: decode_heatmaps(heatmaps))
+            t_hough, hough = timed(
+                lambda: [
+                    postprocess(
+                        (h * 255).astype(np.uint8), low_thresh=170, max_radius=25
+                    )
+                    for h in heatmaps
+                ]
+            )
+            hough = np.array(
+                [(np.nan, np.nan) if p[0] is None else p for p in hough], dtype=float
+            )
+            e_argmax = errors(xy, truth)
+            e_hough = errors(hough, truth)
+            print(
+                f"r={radius:2} {label:9}  {t_argmax / args.points * 1e3:5.2f} ms  "
+                f"{e_argmax.mean():6.2f} / {e_argmax.max():6.2f} px   "
+                f"{t_hough / args.points * 1e3:5.2f} ms  "
+                f"{np.nanmean(e_hough):6.2f} / {np.nanmax(e_hough):6.2f} px "
+                f"({np.isnan(e_hough).sum()} non détectés)"
+            )
+            # Les plateaux saturés sont le cas où l'argmax seul est biaisé
+            if sharpness > 1:
+                assert e_argmax.max() < 1.0, (radius, e_argmax.max())
+                assert e_argmax.mean() <= np.nanmean(e_hough), radius
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# bench_line_intersection.py : Compare l'intersection de lignes sympy et NumPy
+# Lancer depuis code/ : python -m benchmarks.bench_line_intersection
+
+import argparse
+import time
+
+import numpy as np
+
+from terrain.utils import line_intersection, line_intersections
+
+
+def sympy_line_intersection(line1, line2):
+    """Ancienne implémentation basée sur sympy (référence)"""
+    import sympy
+    from sympy import Line
+
+    l1 = Line((line1[0], line1[1]), (line1[2], line1[3]))
+    l2 = Line((line2[0], line2[1]), (line2[2], line2[3]))
+    intersection = l1.intersection(l2)
+    point = None
+    if len(intersection) > 0:
+        if isinstance(intersection[0], sympy.geometry.point.Point2D):
+            point = intersection[0].coordinates
+    return point
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark line_intersection")
+    parser.add_argument("--pairs", type=int, default=200, help="Nombre de paires")
+    args = parser.parse_args()
+
+    # Segments entiers comme ceux renvoyés par cv2.HoughLinesP sur un crop 80x80
+    rng = np.random.default_rng(0)
+    lines1 = rng.integers(0, 80, size=(args.pairs, 4))
+    lines2 = rng.integers(0, 80, size=(args.pairs, 4))
+
+    t_import, _ = timed(lambda: __import__("sympy"))
+    t_sympy, ref = timed(
+        lambda: [sympy_line_intersection(a, b) for a, b in zip(lines1, lines2)]
+    )
+    t_single, single = timed(
+        lambda: [line_intersection(a, b) for a, b in zip(lines1, lines2)], repeat=5
+    )
+    t_batch, batch = timed(lambda: line_intersections(lines1, lines2), repeat=100)
+
+    # Vérification de parité avec sympy
+    errors = []
+    for r, s, b in zip(ref, single, batch):
+        assert (r is None) == (s is None) == np.isnan(b).any()
+        if r is not None:
+            r = np.array([float(v) for v in r])
+            errors.append(max(np.abs(r - s).max(), np.abs(r - b).max()))
+    print(f"Paires : {args.pairs}, écart max vs sympy : {max(errors, default=0):.2e}")
+
+    n = args.pairs
+    print(f"import sympy             : {t_import * 1e3:9.1f} ms")
+    print(f"sympy (par paire)        : {t_sympy / n * 1e6:9.1f} µs")
+    print(f"NumPy line_intersection  : {t_single / n * 1e6:9.1f} µs")
+    print(f"NumPy line_intersections : {t_batch / n * 1e6:9.3f} µs (lot de {n})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# bench_rebounds.py : Compare la détection de rebonds en boucle Python et NumPy
+# Lancer depuis code/ : python -m benchmarks.bench_rebounds
+
+import argparse
+import time
+
+import numpy as np
+
+from Rebond.online import OnlineBounceDetector
+from Rebond.stats import detect_rebounds
+
+
+def detect_rebounds_loop(
+    frames, ys, window_size=5, min_direction_change=4, min_frames_between_rebounds=10
+):
+    """Ancienne implémentation en boucle Python (référence)"""
+    rebounds = []
+    last_rebound_frame = -float("inf")
+
+    if len(frames) < window_size * 2:
+        return rebounds
+
+    for i in range(window_size, len(frames) - window_size):
+        current_frame = frames[i]
+
+        if current_frame - last_rebound_frame < min_frames_between_rebounds:
+            continue
+
+        pre_trajectory = ys[i - window_size : i]
+        post_trajectory = ys[i : i + window_size]
+
+        if len(pre_trajectory) < 3 or len(post_trajectory) < 3:
+            continue
+
+        pre_diffs = [y1 - y2 for y1, y2 in zip(pre_trajectory[:-1], pre_trajectory[1:])]
+        post_diffs = [
+            y1 - y2 for y1, y2 in zip(post_trajectory[:-1], post_trajectory[1:])
+        ]
+
+        pre_direction = sum(diff * (idx + 1) for idx, diff in enumerate(pre_diffs))
+        post_direction = sum(
+            diff * (len(post_diffs) - idx) for idx, diff in enumerate(post_diffs)
+        )
+
+        total_pre_change = pre_trajectory[-1] - pre_trajectory[0]
+        total_post_change = post_trajectory[-1] - post_trajectory[0]
+
+        if (
+            pre_direction < 0
+            and post_direction > 0
+            and abs(total_pre_change) > min_direction_change
+            and abs(total_post_change) > min_direction_change
+            and ys[i] > 160
+            and all(abs(d) < 50 for d in pre_diffs + post_diffs)
+            and abs(total_pre_change) + abs(total_post_change) > 8
+        ):
+            rebounds.append({"frame": current_frame, "y": ys[i]})
+            last_rebound_frame = current_frame
+
+    return rebounds
+
+
+def online_rebounds(frames, ys, **kwargs):
+    """Rebonds émis par ``OnlineBounceDetector`` point par point"""
+    detector = OnlineBounceDetector(**kwargs)
+    rebounds = []
+    for frame, y in zip(frames, ys):
+        bounce = detector.push(frame, 0.0, y)
+        if bounce is not None:
+            rebounds.append({"frame": bounce["frame"], "y": bounce["y"]})
+    return rebounds
+
+
+def synthetic_trajectory(n, seed=0):
+    """
+    Trajectoire synthétique : arcs paraboliques (rebonds) de durée aléatoire,
+    bruit de détection, trous (frames sans balle) et détections aberrantes.
+
+    Returns:
+        tuple: (frames int32, ys float32) comme ``load_ball_data`` sur un ``.npy``
+    """
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(15, 60, size=n // 15 + 1)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)[:n]
+    t = np.arange(n) - starts
+    period = np.repeat(lengths, lengths)[:n]
+    height = np.repeat(rng.uniform(100, 400, size=len(lengths)), lengths)[:n]
+    ys = 600 - height * 4 * (t / period) * (1 - t / period)
+    ys += rng.normal(0, 2, size=n)
+    outliers = rng.random(n) < 0.01
+    ys[outliers] = rng.uniform(0, 720, size=outliers.sum())
+    frames = np.arange(int(n * 1.2))
+    frames = np.sort(rng.choice(frames, size=n, replace=False))
+    return frames.astype(np.int32), ys.astype(np.float32)
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark detect_rebounds")
+    parser.add_argument(
+        "--points", type=int, default=1_000_000, help="Nombre de points"
+    )
+    args = parser.parse_args()
+
+    frames, ys = synthetic_trajectory(args.points)
+
+    # Parité exacte sur plusieurs paramètres, types (NumPy float32, listes
+    # d'entiers comme un ancien JSONL) et tailles de fenêtre
+    small_frames, small_ys = synthetic_trajectory(20_000, seed=1)
+    cases = [
+        (small_frames, small_ys),
+        (small_frames.tolist(), np.round(small_ys).astype(int).tolist()),
+        (small_frames.tolist(), small_ys.astype(float).tolist()),
+    ]
+    for f, y in cases:
+        for window_size in (2, 3, 5, 8):
+            for min_frames in (0, 10, 30):
+                kwargs = dict(
+                    window_size=window_size, min_frames_between_rebounds=min_frames
+                )
+                ref = detect_rebounds_loop(f, y, **kwargs)
+                new = detect_rebounds(f, y, **kwargs)
+                assert ref == new, (window_size, min_frames)
+                assert online_rebounds(f, y, **kwargs) == ref, (window_size, min_frames)
+    for n in (0, 5, 9, 10, 11):
+        assert detect_rebounds_loop(frames[:n], ys[:n]) == detect_rebounds(
+            frames[:n], ys[:n]
+        )
+
+    # Fin de trajectoire : le point n - window_size n'est jamais évalué
+    tail_frames, tail_ys = synthetic_trajectory(3000, seed=18)
+    tail_cases = [
+        (tail_frames.tolist(), tail_ys.astype(float).tolist()),
+        (list(range(11)), [190, 200, 210, 220, 230, 240, 250, 240, 230, 220, 210]),
+    ]
+    for f, y in tail_cases:
+        ref = detect_rebounds_loop(f, y)
+        assert online_rebounds(f, y) == ref == detect_rebounds(f, y)
+    assert online_rebounds(list(range(12)), tail_cases[1][1] + [200]) != []
+
+    t_loop, ref = timed(lambda: detect_rebounds_loop(frames, ys))
+    t_numpy, new = timed(lambda: detect_rebounds(frames, ys), repeat=5)
+    assert ref == new
+    print(f"Points : {args.points}, rebonds : {len(new)} (identiques à la boucle)")
+    print(f"Boucle Python : {t_loop * 1e3:9.1f} ms")
+    print(f"NumPy         : {t_numpy * 1e3:9.1f} ms (x{t_loop / t_numpy:.1f})")
+
+
+if __name__ == "__main__":
+    main()
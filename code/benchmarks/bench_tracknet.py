@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# bench_tracknet.py : Frames/s de BallTrackerNet sur CPU selon les optimisations
+# Lancer depuis code/ : python -m benchmarks.bench_tracknet
+
+import argparse
+import copy
+import itertools
+import time
+
+import torch
+
+from terrain.cpu_optim import bf16_supported, optimize_for_cpu
+from terrain.tracknet import BallTrackerNet
+
+
+def bench(model, inp, bf16, iters):
+    """Frames/s moyen sur ``iters`` passes (après une passe de warm-up)"""
+    with torch.inference_mode():
+        with torch.autocast("cpu", torch.bfloat16, enabled=bf16):
+            out = model(inp)
+            start = time.perf_counter()
+            for _ in range(iters):
+                model(inp)
+    return iters * len(inp) / (time.perf_counter() - start), out.float()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BallTrackerNet CPU")
+    parser.add_argument("--iters", type=int, default=3, help="Passes mesurées")
+    parser.add_argument("--batch", type=int, default=1, help="Taille du lot")
+    parser.add_argument("--threads", type=int, default=None, help="Threads intra-op")
+    parser.add_argument(
+        "--no_compile", action="store_true", help="Ne pas tester torch.compile"
+    )
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    print(f"Threads : {torch.get_num_threads()}, bf16 natif : {bf16_supported()}")
+
+    # Forme du __main__ de tracknet.py
+    base = BallTrackerNet(out_channels=15).eval()
+    inp = torch.rand(args.batch, 3, 360, 640)
+    reference = None
+
+    compile_options = (False,) if args.no_compile else (False, True)
+    for fold_bn, channels_last, bf16, compile in itertools.product(
+        (False, True), (False, True), (False, True), compile_options
+    ):
+        model = optimize_for_cpu(
+            copy.deepcopy(base),
+            fold_bn=fold_bn,
+            channels_last=channels_last,
+            bf16=bf16,
+            compile=compile,
+            warmup_batch=args.batch,
+        )
+        x = inp.contiguous(
+            memory_format=(
+                torch.channels_last if channels_last else torch.contiguous_format
+            )
+        )
+        fps, out = bench(model, x, bf16, args.iters)
+        if reference is None:
+            reference = out
+        error = (out - reference).abs().max().item()
+        print(
+            f"fold_bn={fold_bn!s:5} channels_last={channels_last!s:5} "
+            f"bf16={bf16!s:5} compile={compile!s:5} : "
+            f"{fps:7.2f} frames/s (écart max {error:.1e})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# import_budget.py : Vérifie le temps d'import à froid des points d'entrée
+# Lancer depuis code/ : python -m benchmarks.import_budget
+
+import argparse
+import subprocess
+import sys
+import time
+
+# Point d'entrée -> (commande, budget en ms du temps total d'import)
+TARGETS = {
+    "main.py": (["main.py", "--help"], 400),
+    "detectionfaute.py": (["detectionfaute.py", "--help"], 300),
+    "Rebond/stats.py": (["-c", "import Rebond.stats"], 300),
+}
+
+
+def import_profile(args):
+    """
+    Lance ``python -X importtime`` dans un nouveau processus.
+
+    Returns:
+        tuple: (durée totale des imports en ms, durée du processus en ms,
+        liste des imports de premier niveau (cumul ms, module))
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = (time.perf_counter() - start) * 1e3
+
+    total, top_level = 0.0, []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        total += int(self_us) / 1e3
+        if not name.startswith("  "):
+            top_level.append((int(cumulative_us) / 1e3, name.strip()))
+    return total, wall, sorted(top_level, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget de temps d'import")
+    parser.add_argument("--top", type=int, default=5, help="Imports les plus lents")
+    args = parser.parse_args()
+
+    over_budget = []
+    for target, (command, budget) in TARGETS.items():
+        total, wall, top_level = import_profile(command)
+        status = "OK" if total <= budget else "DÉPASSÉ"
+        print(
+            f"{target:18} imports {total:7.1f} ms / budget {budget} ms "
+            f"(processus {wall:.0f} ms) {status}"
+        )
+        for cumulative, name in top_level[: args.top]:
+            print(f"    {cumulative:7.1f} ms  {name}")
+        if total > budget:
+            over_budget.append(target)
+
+    if over_budget:
+        sys.exit(f"Budget d'import dépassé : {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
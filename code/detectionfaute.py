@@ -2,41 +2,36 @@
 # detectionfaute.py : Utilitaire pour vérifier si un rebond est in ou out
 
 import argparse
-import json
 import os
+from Ball.trajectory import load_position
 from Fautes.algo_v9 import detection_fautes
+from terrain.timeline import court_json_for_frame
 
 
-def verifier_faute(terrain_json_path, ball_jsonl_path, frame_no, player="all"):
+def verifier_faute(terrain_json_path, ball_path, frame_no, player="all"):
     """
     Vérifie si un rebond est in ou out pour une frame spécifique.
 
     Args:
         terrain_json_path: Chemin vers le fichier JSON contenant les points du terrain
-        ball_jsonl_path: Chemin vers le fichier JSONL avec les données de la balle
+            (calibration unique ou suite de calibrations indexée par frame)
+        ball_path: Chemin vers la trajectoire de la balle (``balle.npy``, ou
+            ancien fichier JSONL)
         frame_no: Numéro de la frame à analyser
         player: Joueur concerné ('all' par défaut)
 
     Returns:
         Tuple (bool, tuple): (True si in/False si out, (x, y) coordonnées de la balle)
     """
-    # Charger les données du terrain
-    with open(terrain_json_path, "r") as f:
-        terrain_str = f.read()
+    # Charger les données du terrain en vigueur à cette frame
+    terrain_str = court_json_for_frame(terrain_json_path, frame_no)
 
     # Rechercher la position de la balle dans la frame spécifiée
-    x = y = None
-    with open(ball_jsonl_path, "r") as f:
-        for line in f:
-            item = json.loads(line)
-            if item.get("frame") == frame_no and not item.get("no_detection", True):
-                det = item["detections"][0]
-                x, y = det["Ball_X"], det["Ball_Y"]
-                break
-
-    if x is None or y is None:
+    position = load_position(ball_path, frame_no)
+    if position is None:
         print(f"Aucune détection pour la frame {frame_no}")
         return None, (None, None)
+    x, y = position
 
     # Utiliser la fonction de détection de fautes
     good = detection_fautes(terrain_str, x, y, player)
@@ -54,8 +49,8 @@ if __name__ == "__main__":
     parser.add_argument(
         "--balle",
         type=str,
-        default="./output/balle/balle.jsonl",
-        help="Chemin vers le fichier JSONL de la balle",
+        default="./output/balle/balle.npy",
+        help="Chemin vers la trajectoire de la balle (.npy ou .jsonl)",
     )
     parser.add_argument(
         "--frame", type=int, required=True, help="Numéro de la frame à analyser"
@@ -8,27 +8,36 @@ TERRAIN_OUTPUT_DIR = (
     "./output/terrain"  # Dossier de sortie pour la détection de terrain
 )
 BALL_OUTPUT_DIR = "./output/balle"  # Dossier de sortie pour la détection de balle
+BALL_BATCH_SIZE = 8  # Nombre de frames par appel au modèle YOLO de la balle
+BALL_FRAME_OUTPUT = "none"  # Sortie image : "none", "video", "crops" ou "png"
+BALL_ROI_TRACKING = False  # Chercher la balle autour de la position prédite (Kalman)
+BALL_COURT_ROI = None  # Région du terrain : "mask", "crop" ou None (frame entière)
+BALL_COURT_MARGIN = 100  # Marge (pixels) autour du terrain projeté
 DURATION = 4.0  # Durée (s) pour la détection du terrain
 USE_REFINE_KPS = True  # Activer refine_kps
 USE_HOMOGRAPHY = True  # Activer homography postprocessing
-REBOUND_FRAME = 9999  # Frame de rebond pour la détection de fautes
+TERRAIN_BATCH_SIZE = 8  # Nombre de frames par lot pour le modèle TrackNet
+KEYPOINT_DECODER = "argmax"  # Extraction des points : "argmax" ou "hough"
+TERRAIN_BACKEND = "torch"  # Inférence du terrain : "torch", "torch_cpu" ou "onnx"
+TERRAIN_ONNX_MODEL = None  # Modèle ONNX (quantifié ou non), None = export auto
+TERRAIN_NUM_THREADS = None  # Threads intra-op (backends torch_cpu/onnx), None = auto
+ADAPTIVE_CALIBRATION = True  # Arrêt dès que les points du terrain sont stables
+WRITE_TERRAIN_VIDEO = False  # Générer la vidéo annotée avec les points du terrain
+CALIBRATION_CACHE_DIR = "./output/cache_terrain"  # Cache des calibrations (None = off)
+RECALIBRATE = False  # Recalibrer le terrain quand la caméra bouge (matchs complets)
+BOUNCE_WINDOW = 5  # Fenêtre (positions) du détecteur de rebonds en ligne
+BOUNCE_REFINE = True  # Position du rebond affinée entre deux frames (paraboles)
+BOUNCE_PLAYER = "all"  # Joueur pour la détection de fautes : "all", "bottom_player"...
 
 import argparse
 import json
 import os
-import time
 
-from Ball.position_ball import ball
 from Fautes.algo_v9 import detection_fautes
-from terrain.infer_in_video import infer_terrain
+from terrain.timeline import court_json_for_frame
 
-
-def Rebond():
-    """
-    Simule la détection de rebond.
-    """
-    time.sleep(1)
-    return True
+# Les étapes lourdes (torch, ultralytics, opencv) sont importées au moment où
+# elles s'exécutent : --help et le parsing des arguments restent instantanés.
 
 
 def main():
@@ -45,6 +54,11 @@ def main():
         default=DURATION,
         help="Durée pour la détection du terrain en secondes",
     )
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Ignorer le cache de calibration du terrain",
+    )
     args = parser.parse_args()
 
     # Récupération des paramètres depuis la configuration
@@ -60,48 +74,106 @@ def main():
     # 1) Détection du terrain
     terrain_json = os.path.join(TERRAIN_OUTPUT_DIR, "terrain_points.json")
     print("[1/3] Lancement détection terrain...")
+    from terrain.infer_in_video import infer_terrain
+
     infer_terrain(
         model_path=model_path,
         video_path=video_path,
         output_json=terrain_json,
         duration=duration,
         use_refine_kps=use_refine_kps,
+        batch_size=TERRAIN_BATCH_SIZE,
+        keypoint_decoder=KEYPOINT_DECODER,
+        adaptive=ADAPTIVE_CALIBRATION,
+        cache_dir=None if args.no_cache else CALIBRATION_CACHE_DIR,
+        write_annotated=WRITE_TERRAIN_VIDEO,
+        backend=TERRAIN_BACKEND,
+        onnx_path=TERRAIN_ONNX_MODEL,
+        num_threads=TERRAIN_NUM_THREADS,
     )
     print(f"→ JSON terrain généré dans {terrain_json}")
 
-    # après la détection terrain
-    with open(terrain_json, "r") as f:
-        terrain_str = f.read()
+    # Recalibration en arrière-plan pendant la détection de balle, avec une
+    # suite de calibrations partagée en mémoire
+    recalibration = None
+    timeline = None
+    if RECALIBRATE:
+        from terrain.recalibration import start_background_recalibration
+        from terrain.timeline import CourtTimeline
+
+        timeline = CourtTimeline()
+        recalibration = start_background_recalibration(
+            model_path,
+            video_path,
+            os.path.join(TERRAIN_OUTPUT_DIR, "terrain_timeline.json"),
+            batch_size=TERRAIN_BATCH_SIZE,
+            use_refine_kps=use_refine_kps,
+            keypoint_decoder=KEYPOINT_DECODER,
+            backend=TERRAIN_BACKEND,
+            onnx_path=TERRAIN_ONNX_MODEL,
+            num_threads=TERRAIN_NUM_THREADS,
+            timeline=timeline,
+        )
+
+    # Analyse des fautes à chaque rebond, en direct pendant la détection de
+    # balle (les positions sont passées au détecteur dès qu'elles sont suivies)
+    from Rebond.online import OnlineBounceDetector
+
+    faults = []
+
+    def on_bounce(bounce):
+        frame_no, x, y = bounce["frame"], bounce["x"], bounce["y"]
+        if timeline is None:
+            terrain_str = court_json_for_frame(terrain_json, frame_no)
+        else:
+            # Terrain en vigueur à la frame du rebond : attendre que la
+            # recalibration ait dépassé cette frame
+            timeline.wait_final(frame_no)
+            terrain_str = timeline.court_json(frame_no)
+        if terrain_str is None or None in json.loads(terrain_str)["points"]:
+            print(f"[Rebond] Frame {frame_no} : terrain non visible")
+            return
+        good = detection_fautes(terrain_str, x, y, BOUNCE_PLAYER)
+        faults.append((frame_no, good))
+        print(
+            f"[Rebond] Frame {frame_no} : x={x:.1f}, y={y:.1f} → "
+            + ("IN 🎾" if good else "Faute!")
+        )
+
+    bounces = OnlineBounceDetector(
+        window_size=BOUNCE_WINDOW, on_bounce=on_bounce, refine=BOUNCE_REFINE
+    )
 
     # 2) Détection de la balle
-    print("[2/3] Lancement détection balle...")
+    print("[2/3] Lancement détection balle et rebonds...")
+    from Ball.position_ball import ball
+
+    # La région du terrain vient de la calibration initiale : inutilisable
+    # si la caméra bouge (recalibration), la balle réelle serait ignorée
+    court_roi = BALL_COURT_ROI
+    if court_roi and RECALIBRATE:
+        print("Recalibration active : recherche de la balle sur la frame entière.")
+        court_roi = None
+
     ball(
         output_dir=BALL_OUTPUT_DIR,
         video_path=video_path,
         model_path="Ball/best2.pt",
+        batch_size=BALL_BATCH_SIZE,
+        frame_output=BALL_FRAME_OUTPUT,
+        roi_tracking=BALL_ROI_TRACKING,
+        terrain_json=terrain_json if court_roi else None,
+        court_roi=court_roi,
+        court_margin=BALL_COURT_MARGIN,
+        on_position=bounces.push,
     )
 
-    print("[3/3] Lancement détection Faute...")
-    # 3) Analyse des fautes après chaque rebond
-    if Rebond():
-        # Récupération de la position de balle à partir du JSONL
-        frame_no = REBOUND_FRAME
-        player = "all"
-        x = y = None
-        ball_jsonl = os.path.join(BALL_OUTPUT_DIR, "balle.jsonl")
-        with open(ball_jsonl, "r") as f:
-            for line in f:
-                item = json.loads(line)
-                if item.get("frame") == frame_no and not item.get("no_detection", True):
-                    det = item["detections"][0]
-                    x, y = det["Ball_X"], det["Ball_Y"]
-                    print(f"Frame {frame_no} : x={x}, y={y}")
-                    break
-        if x is None or y is None:
-            print(f"Aucune détection pour la frame {frame_no}")
-        else:
-            good = detection_fautes(terrain_str, x, y, player)
-            print("\n\n\nBalle IN!! 🎾" if good else "Faute!")
+    if recalibration is not None:
+        recalibration.join()
+
+    print("[3/3] Bilan des rebonds...")
+    n_in = sum(good for _, good in faults)
+    print(f"{len(faults)} rebond(s) : {n_in} IN, {len(faults) - n_in} faute(s)")
 
     print("Pipeline terminé.")
 
@@ -0,0 +1,133 @@
+import numpy as np
+
+from terrain.homography import points_array
+
+
+class KeypointConvergence:
+    """
+    Suit la stabilité des points du terrain au fil des frames.
+
+    Moyenne et variance de chaque point sont mises à jour en ligne (Welford).
+    Une frame est stable quand tous les points déjà vus sont détectés et à
+    moins de ``tolerance`` pixels de leur moyenne courante ; la calibration
+    a convergé après ``patience`` frames stables consécutives.
+    """
+
+    def __init__(self, tolerance=2.0, patience=10, num_points=14, min_visible=4):
+        self.tolerance = tolerance
+        self.patience = patience
+        self.min_visible = min_visible
+        self.count = np.zeros(num_points, dtype=np.int64)
+        self.mean = np.zeros((num_points, 2), dtype=np.float64)
+        self._m2 = np.zeros((num_points, 2), dtype=np.float64)
+        self.stable_frames = 0
+
+    @property
+    def std(self):
+        """Écart-type courant (pixels) de chaque point, NaN si jamais vu"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = self._m2.sum(axis=1) / self.count
+        return np.sqrt(np.where(self.count > 0, var, np.nan))
+
+    @property
+    def converged(self):
+        return self.stable_frames >= self.patience
+
+    def update(self, pts):
+        """
+        Ajoute les points d'une frame.
+
+        Args:
+            pts: Liste de 14 points (x, y) ou tableau (14, 2) avec NaN
+
+        Returns:
+            bool: True si la calibration a convergé
+        """
+        arr = points_array(pts)
+        visible = ~np.isnan(arr).any(axis=1)
+        seen = self.count > 0
+
+        deviation = np.linalg.norm(arr - self.mean, axis=1)
+        stable = (
+            visible.sum() >= self.min_visible
+            and visible[seen].all()
+            and (deviation[seen] < self.tolerance).all()
+        )
+        self.stable_frames = self.stable_frames + 1 if stable else 0
+
+        # Mise à jour de Welford sur les points visibles
+        self.count[visible] += 1
+        delta = arr[visible] - self.mean[visible]
+        self.mean[visible] += delta / self.count[visible, None]
+        self._m2[visible] += delta * (arr[visible] - self.mean[visible])
+        return self.converged
+
+
+def _grid_mode(points, valid, grid):
+    """Centre de la cellule la plus peuplée (grille de ``grid`` pixels) par point"""
+    num_frames, num_points = valid.shape
+    estimate = np.full((num_points, 2), np.nan)
+    if not valid.any():
+        return estimate
+
+    cells = np.floor(points[valid] / grid).astype(np.int64)
+    cells -= cells.min(axis=0)
+    size_x, size_y = cells.max(axis=0) + 1
+    point_idx = np.nonzero(valid)[1]
+    keys = (point_idx * size_x + cells[:, 0]) * size_y + cells[:, 1]
+
+    uniq, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    owner = uniq // (size_x * size_y)
+    # Pour chaque point : cellule la plus fréquente (la plus petite en cas d'égalité)
+    order = np.lexsort((uniq, -counts, owner))
+    owners, first = np.unique(owner[order], return_index=True)
+    best = np.zeros(len(uniq), dtype=bool)
+    best[order[first]] = True
+
+    # Moyenne des observations tombant dans la cellule retenue
+    in_best = best[inverse]
+    sums = np.zeros((num_points, 2))
+    np.add.at(sums, point_idx[in_best], points[valid][in_best])
+    estimate[owners] = sums[owners] / counts[best][:, None]
+    return estimate
+
+
+def aggregate_keypoints(points, method="mode", trim=0.2, grid=1.0):
+    """
+    Agrège les détections de chaque point du terrain sur plusieurs frames.
+
+    Args:
+        points: Tableau (frames, 14, 2) avec NaN pour les points non détectés
+        method: ``"median"``, ``"trimmed_mean"`` (``trim`` retiré de chaque
+            côté) ou ``"mode"`` (mode 2D sur une grille de ``grid`` pixels)
+
+    Returns:
+        tuple: (points agrégés (14, 2) avec NaN, dispersion (14,) = distance
+        médiane en pixels des détections au point agrégé)
+    """
+    points = np.asarray(points, dtype=np.float64)
+    valid = ~np.isnan(points).any(axis=2)
+    points = np.where(valid[..., None], points, np.nan)
+    counts = valid.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if method == "median":
+            estimate = np.full(points.shape[1:], np.nan)
+            seen = counts > 0
+            estimate[seen] = np.nanmedian(points[:, seen], axis=0)
+        elif method == "trimmed_mean":
+            ordered = np.sort(points, axis=0)  # NaN en fin de tri
+            cut = np.floor(trim * counts).astype(np.int64)[:, None]
+            rank = np.arange(len(points))[:, None, None]
+            keep = (rank >= cut) & (rank < (counts[:, None] - cut))
+            estimate = np.where(keep, ordered, 0.0).sum(axis=0) / keep.sum(axis=0)
+        elif method == "mode":
+            estimate = _grid_mode(points, valid, grid)
+        else:
+            raise ValueError(f"Méthode d'agrégation inconnue : {method}")
+
+        dist = np.linalg.norm(points - estimate, axis=2)
+        dispersion = np.full(len(counts), np.nan)
+        seen = counts > 0
+        dispersion[seen] = np.nanmedian(dist[:, seen], axis=0)
+    return estimate, dispersion
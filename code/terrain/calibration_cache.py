@@ -0,0 +1,173 @@
+import hashlib
+import os
+import time
+
+import cv2
+import numpy as np
+
+from terrain.homography import court_ref, get_trans_matrix
+from terrain.video_io import iter_frames
+
+FINGERPRINT_SIZE = (160, 90)
+
+
+def video_fingerprint(video_path, num_frames=5, stride=5):
+    """
+    Empreinte rapide de la vue caméra : résolution et image de contours
+    moyenne de quelques frames sous-échantillonnées.
+
+    Returns:
+        tuple: (résolution (w, h), contours float32 dans [0, 1], première frame)
+    """
+    edges = []
+    first = None
+    for i, frame in enumerate(iter_frames(video_path, max_frames=num_frames * stride)):
+        if i % stride:
+            continue
+        if first is None:
+            first = frame
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, FINGERPRINT_SIZE, interpolation=cv2.INTER_AREA)
+        edges.append(cv2.Canny(small, 50, 150).astype(np.float32) / 255.0)
+    if first is None:
+        return None, None, None
+    h, w = first.shape[:2]
+    return (w, h), np.mean(edges, axis=0), first
+
+
+def reprojection_error(frame, homography, samples_per_line=50, white_thresh=155):
+    """
+    Erreur (pixels) entre les lignes du terrain de référence projetées par
+    ``homography`` et les lignes blanches visibles dans ``frame`` : médiane
+    de la distance entre les points échantillonnés sur les lignes projetées
+    et le pixel blanc le plus proche.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    not_white = (gray <= white_thresh).astype(np.uint8)
+    dist = cv2.distanceTransform(not_white, cv2.DIST_L2, 3)
+
+    lines = np.array(court_ref.get_important_lines(), dtype=np.float32).reshape(
+        -1, 2, 2
+    )
+    t = np.linspace(0.0, 1.0, samples_per_line, dtype=np.float32)[None, :, None]
+    samples = lines[:, :1] + (lines[:, 1:] - lines[:, :1]) * t
+    proj = cv2.perspectiveTransform(samples.reshape(-1, 1, 2), homography).reshape(
+        -1, 2
+    )
+
+    h, w = dist.shape
+    inside = (proj[:, 0] >= 0) & (proj[:, 0] < w) & (proj[:, 1] >= 0) & (proj[:, 1] < h)
+    if inside.sum() < samples_per_line:
+        return np.inf
+    px = proj[inside].astype(np.int32)
+    return float(np.median(dist[px[:, 1], px[:, 0]]))
+
+
+class CalibrationCache:
+    """
+    Cache disque des calibrations du terrain (points + homographie).
+
+    Chaque entrée est indexée par la résolution et l'image de contours de la
+    vue caméra. Une entrée n'est réutilisée que si l'erreur de reprojection
+    des lignes du terrain sur la nouvelle vidéo reste sous ``max_error``
+    pixels. Les entrées plus vieilles que ``max_age_days`` ou au-delà des
+    ``max_entries`` plus récemment utilisées sont supprimées.
+    """
+
+    def __init__(
+        self,
+        cache_dir,
+        max_entries=32,
+        max_age_days=30,
+        max_error=3.0,
+        min_similarity=0.7,
+    ):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 24 * 3600
+        self.max_error = max_error
+        self.min_similarity = min_similarity
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entries(self, resolution=None):
+        prefix = "" if resolution is None else "{}x{}_".format(*resolution)
+        return [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".npz") and name.startswith(prefix)
+        ]
+
+    def evict(self):
+        """Supprime les entrées trop vieilles puis les moins récemment utilisées"""
+        now = time.time()
+        entries = sorted(self._entries(), key=os.path.getmtime, reverse=True)
+        for i, path in enumerate(entries):
+            if i >= self.max_entries or now - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+
+    def lookup(self, video_path):
+        """
+        Cherche une calibration valide pour la vidéo.
+
+        Returns:
+            tuple | None: (14 points du terrain, dispersion de chaque point),
+            ou None si aucune entrée du cache ne correspond à la vue caméra
+        """
+        self.evict()
+        resolution, edges, frame = video_fingerprint(video_path)
+        if resolution is None:
+            return None
+
+        candidates = []
+        for path in self._entries(resolution):
+            with np.load(path) as entry:
+                similarity = np.corrcoef(edges.ravel(), entry["edges"].ravel())[0, 1]
+                if similarity >= self.min_similarity:
+                    candidates.append((similarity, path))
+
+        for similarity, path in sorted(candidates, reverse=True):
+            with np.load(path) as entry:
+                homography = entry["homography"]
+                points = entry["points"]
+                dispersion = entry["dispersion"]
+            error = reprojection_error(frame, homography)
+            if error <= self.max_error:
+                os.utime(path)
+                print(f"[Terrain] Calibration en cache (erreur {error:.1f} px)")
+                points = [
+                    None if np.isnan(p).any() else (int(p[0]), int(p[1]))
+                    for p in points
+                ]
+                return points, dispersion
+        return None
+
+    def store(self, video_path, points, dispersion):
+        """
+        Ajoute la calibration de la vidéo au cache.
+
+        Returns:
+            bool: False si l'homographie n'a pas pu être calculée
+        """
+        homography = get_trans_matrix(
+            [p if p is not None else (None, None) for p in points]
+        )
+        if homography is None:
+            return False
+        resolution, edges, _ = video_fingerprint(video_path)
+        if resolution is None:
+            return False
+
+        arr = np.array(
+            [p if p is not None else (np.nan, np.nan) for p in points], dtype=np.float64
+        )
+        key = hashlib.sha1(edges.tobytes()).hexdigest()[:16]
+        path = os.path.join(self.cache_dir, "{}x{}_{}.npz".format(*resolution, key))
+        np.savez_compressed(
+            path,
+            edges=edges,
+            points=arr,
+            dispersion=np.asarray(dispersion, dtype=np.float64),
+            homography=homography,
+        )
+        self.evict()
+        return True
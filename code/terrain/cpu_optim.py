@@ -0,0 +1,100 @@
+import torch
+import torch.nn as nn
+
+from terrain.tracknet import ConvBlock
+
+
+class FoldedConvBlock(nn.Module):
+    """
+    ``ConvBlock`` (Conv → ReLU → BN) dont la BatchNorm est repliée dans la
+    convolution.
+
+    En inférence, BN(y) = s·y + t par canal. Comme ReLU(|s|·z) = |s|·ReLU(z),
+    on a BN(ReLU(z)) = signe(s)·ReLU(|s|·z) + t : les poids de la convolution
+    sont multipliés par |s| et il ne reste qu'un décalage (et un changement
+    de signe pour les canaux où s < 0) après la ReLU. Le résultat est exact.
+    """
+
+    def __init__(self, block):
+        super().__init__()
+        conv, _, bn = block.block
+        scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+        shift = bn.bias - bn.running_mean * scale
+
+        self.conv = nn.Conv2d(
+            conv.in_channels,
+            conv.out_channels,
+            conv.kernel_size,
+            stride=conv.stride,
+            padding=conv.padding,
+        )
+        with torch.no_grad():
+            self.conv.weight.copy_(conv.weight * scale.abs().view(-1, 1, 1, 1))
+            bias = conv.bias if conv.bias is not None else torch.zeros_like(scale)
+            self.conv.bias.copy_(bias * scale.abs())
+        self.relu = nn.ReLU(inplace=True)
+        self.register_buffer("shift", shift.detach().view(1, -1, 1, 1))
+        self.register_buffer("sign", torch.sign(scale).detach().view(1, -1, 1, 1))
+        self._signed = bool((scale < 0).any())
+
+    def forward(self, x):
+        x = self.relu(self.conv(x))
+        if self._signed:
+            return torch.addcmul(self.shift, self.sign, x)
+        return x + self.shift
+
+
+def fold_batchnorm(model):
+    """Remplace (en place) chaque ``ConvBlock`` du modèle par un ``FoldedConvBlock``"""
+    for name, module in model.named_children():
+        if isinstance(module, ConvBlock):
+            setattr(model, name, FoldedConvBlock(module))
+        else:
+            fold_batchnorm(module)
+    return model
+
+
+def bf16_supported():
+    """Vrai si le CPU exécute les convolutions bfloat16 nativement (AVX512-BF16, AMX)"""
+    return torch.backends.mkldnn.is_available() and bool(
+        torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    )
+
+
+def optimize_for_cpu(
+    model,
+    fold_bn=True,
+    channels_last=True,
+    bf16=False,
+    compile=False,
+    num_threads=None,
+    warmup_batch=1,
+):
+    """
+    Prépare un ``BallTrackerNet`` (en mode eval) pour l'inférence CPU.
+
+    Args:
+        fold_bn: Replier les BatchNorm dans les convolutions
+        channels_last: Format mémoire NHWC (plus rapide avec oneDNN)
+        bf16: Le modèle sera appelé sous autocast bfloat16 (warm-up inclus)
+        compile: ``torch.compile`` suivi d'un warm-up sur ``warmup_batch``
+            frames, pour ne pas payer la compilation sur la première frame
+        num_threads: Nombre de threads intra-op (``torch.set_num_threads``)
+
+    Returns:
+        nn.Module: Modèle optimisé
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    model = model.eval()
+    if fold_bn:
+        model = fold_batchnorm(model)
+    memory_format = torch.channels_last if channels_last else torch.contiguous_format
+    model = model.to(memory_format=memory_format)
+    if compile:
+        model = torch.compile(model)
+        warmup = torch.rand(warmup_batch, 3, 360, 640).to(memory_format=memory_format)
+        with torch.inference_mode():
+            with torch.autocast("cpu", torch.bfloat16, enabled=bf16):
+                model(warmup)
+    return model
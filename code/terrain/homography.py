@@ -1,7 +1,6 @@
 from .court_reference import CourtReference
 import numpy as np
 import cv2
-from scipy.spatial import distance
 
 court_ref = CourtReference()
 refer_kps = np.array(court_ref.key_points, dtype=np.float32).reshape((-1, 1, 2))
@@ -14,26 +13,138 @@ for i in range(len(court_ref.court_conf)):
         inds.append(court_ref.key_points.index(conf[j]))
     court_conf_ind[i + 1] = inds
 
+# Configurations empilées : sources (12, 4, 2) et indices des points (12, 4)
+_conf_src = np.array(
+    [court_ref.court_conf[i] for i in range(1, 13)], dtype=np.float64
+).reshape(12, 4, 2)
+_conf_inds = np.array([court_conf_ind[i] for i in range(1, 13)])
+_refer_h = np.concatenate([refer_kps.reshape(-1, 2), np.ones((len(refer_kps), 1))], 1)
 
-def get_trans_matrix(points):
-    matrix_trans = None
-    dist_max = np.Inf
-    for conf_ind in range(1, 13):
-        conf = court_ref.court_conf[conf_ind]
-
-        inds = court_conf_ind[conf_ind]
-        inters = [points[inds[0]], points[inds[1]], points[inds[2]], points[inds[3]]]
-        if not any([None in x for x in inters]):
-            matrix, _ = cv2.findHomography(
-                np.float32(conf), np.float32(inters), method=0
-            )
-            trans_kps = cv2.perspectiveTransform(refer_kps, matrix)
-            dists = []
-            for i in range(12):
-                if i not in inds and points[i][0] is not None:
-                    dists.append(distance.euclidean(points[i], trans_kps[i]))
-            dist_median = np.mean(dists)
-            if dist_median < dist_max:
-                matrix_trans = matrix
-                dist_max = dist_median
-    return matrix_trans
+# Seuls les 12 premiers points servent au score (les 2 points du milieu non)
+_scored = np.zeros((12, len(refer_kps)), dtype=bool)
+_scored[:, :12] = True
+_scored[np.arange(12)[:, None], _conf_inds] = False
+
+
+def points_array(points):
+    """Convertit une liste de points (x, y) / None en tableau (N, 2) avec NaN"""
+    if isinstance(points, np.ndarray):
+        return points.astype(np.float64).reshape(-1, 2)
+    return np.array(
+        [
+            (np.nan, np.nan) if p is None or p[0] is None or p[1] is None else p
+            for p in points
+        ],
+        dtype=np.float64,
+    )
+
+
+def _solve_homographies(src, dst):
+    """
+    Homographies exactes 4 points → 4 points pour tout un lot (DLT).
+
+    Args:
+        src, dst: Tableaux (C, 4, 2)
+
+    Returns:
+        tuple: (matrices (C, 3, 3), masque des systèmes non dégénérés (C,))
+    """
+    n = len(src)
+    x, y = src[..., 0], src[..., 1]
+    u, v = dst[..., 0], dst[..., 1]
+    zeros, ones = np.zeros_like(x), np.ones_like(x)
+    rows_u = np.stack([x, y, ones, zeros, zeros, zeros, -u * x, -u * y], -1)
+    rows_v = np.stack([zeros, zeros, zeros, x, y, ones, -v * x, -v * y], -1)
+    A = np.concatenate([rows_u, rows_v], axis=1)  # (C, 8, 8)
+    b = np.concatenate([u, v], axis=1)  # (C, 8)
+
+    try:
+        h = np.linalg.solve(A, b[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        # Au moins une configuration dégénérée (points alignés) : cas par cas
+        h = np.full((n, 8), np.nan)
+        for c in range(n):
+            try:
+                h[c] = np.linalg.solve(A[c], b[c])
+            except np.linalg.LinAlgError:
+                pass
+    matrices = np.concatenate([h, np.ones((n, 1))], axis=1).reshape(n, 3, 3)
+    return matrices, np.isfinite(matrices).all(axis=(1, 2))
+
+
+def court_mask(points, frame_size, margin=0, mask_type=0):
+    """
+    Masque image du terrain : ``court_ref.get_court_mask(mask_type)`` projeté
+    par l'homographie des points détectés puis dilaté de ``margin`` pixels.
+
+    Args:
+        frame_size: (largeur, hauteur) de la vidéo
+
+    Returns:
+        np.ndarray | None: Masque uint8 (hauteur, largeur), 1 dans le terrain ;
+        None si l'homographie n'est pas calculable
+    """
+    matrix = get_trans_matrix(points)
+    if matrix is None:
+        return None
+    if not hasattr(court_ref, "court"):
+        court_ref.build_court_reference()
+    mask = cv2.warpPerspective(
+        court_ref.get_court_mask(mask_type), matrix, tuple(frame_size)
+    )
+    if margin > 0:
+        kernel = cv2.getStructuringElement(
+            cv2.MORPH_ELLIPSE, (2 * margin + 1, 2 * margin + 1)
+        )
+        mask = cv2.dilate(mask, kernel)
+    return mask
+
+
+def get_trans_matrix(points, method="configurations", ransac_thresh=10.0):
+    """
+    Homographie terrain de référence → image à partir des points détectés.
+
+    ``"configurations"`` : une homographie par configuration de 4 points
+    visibles, scorée en une fois par la distance moyenne de reprojection des
+    autres points ; la meilleure est renvoyée. ``"ransac"`` : une seule
+    homographie RANSAC sur tous les points visibles.
+
+    Returns:
+        np.ndarray | None: Matrice 3x3, None si aucune n'est calculable
+    """
+    pts = points_array(points)
+    visible = ~np.isnan(pts).any(axis=1)
+
+    if method == "ransac":
+        if visible.sum() < 4:
+            return None
+        matrix, _ = cv2.findHomography(
+            refer_kps[visible],
+            pts[visible].astype(np.float32),
+            cv2.RANSAC,
+            ransac_thresh,
+        )
+        return matrix
+    if method != "configurations":
+        raise ValueError(f"Méthode d'homographie inconnue : {method}")
+
+    confs = np.flatnonzero(visible[_conf_inds].all(axis=1))
+    if len(confs) == 0:
+        return None
+    matrices, valid = _solve_homographies(_conf_src[confs], pts[_conf_inds[confs]])
+
+    # Reprojection des points de référence par toutes les homographies
+    proj = np.einsum("cij,kj->cki", matrices, _refer_h)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        proj = proj[..., :2] / proj[..., 2:]
+    dists = np.linalg.norm(proj - pts, axis=2)
+    mask = _scored[confs] & visible
+    counts = mask.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scores = np.where(mask, dists, 0.0).sum(axis=1) / counts
+    scores[~valid | (counts == 0) | ~np.isfinite(scores)] = np.inf
+
+    best = np.argmin(scores)
+    if not np.isfinite(scores[best]):
+        return None
+    return matrices[best]
@@ -1,44 +1,192 @@
 import os
 import cv2
 import numpy as np
-import torch
-import torch.nn.functional as F
 from tqdm import tqdm
-from scipy.stats import mode
 import json
+from itertools import islice
 
-from terrain.tracknet import BallTrackerNet
-from terrain.postprocess import postprocess, refine_kps
-from terrain.homography import get_trans_matrix, refer_kps
+from terrain.calibration import KeypointConvergence, aggregate_keypoints
+from terrain.calibration_cache import CalibrationCache
+from terrain.postprocess import decode_heatmaps, postprocess, refine_kps
+from terrain.homography import get_trans_matrix, points_array, refer_kps
+from terrain.video_io import VideoWriterThread, get_video_info, iter_frames
 
 
 def read_video(path_video):
-    """Lit la vidéo et renvoie les frames et le fps"""
-    cap = cv2.VideoCapture(path_video)
-    fps = int(cap.get(cv2.CAP_PROP_FPS))
-    frames = []
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frames.append(frame)
-    cap.release()
-    return frames, fps
+    """
+    Lit toute la vidéo et renvoie les frames et le fps.
+    Charge toute la vidéo en mémoire : préférer ``iter_frames``.
+    """
+    fps = get_video_info(path_video)[0]
+    return list(iter_frames(path_video)), fps
 
 
 def write_video(imgs, fps, path_output_video):
-    """Écrit une vidéo à partir d'une liste de frames"""
-    if not imgs:
+    """Écrit une vidéo à partir d'une liste ou d'un itérable de frames"""
+    imgs = iter(imgs)
+    first = next(imgs, None)
+    if first is None:
         print("⚠ Aucune frame à écrire !")
         return
-    h, w = imgs[0].shape[:2]
+    h, w = first.shape[:2]
     fourcc = cv2.VideoWriter_fourcc(*"mp4v")
     out = cv2.VideoWriter(path_output_video, fourcc, fps, (w, h))
+    out.write(first)
     for f in imgs:
         out.write(f)
     out.release()
 
 
+class KeypointOverlay:
+    """
+    Calque des points du terrain, dessiné une seule fois puis fusionné
+    (alpha) sur chaque frame, uniquement dans de petites zones autour des
+    points.
+    """
+
+    def __init__(self, points, shape):
+        h, w = shape
+        color = np.zeros((h, w, 3), dtype=np.uint8)
+        alpha = np.zeros((h, w), dtype=np.uint8)
+        self.patches = []
+        for idx, p in enumerate(points):
+            if not p:
+                continue
+            x, y = int(p[0]), int(p[1])
+            for img, circle_col, text_col in (
+                (color, (0, 255, 0), (255, 255, 255)),
+                (alpha, 255, 255),
+            ):
+                cv2.circle(img, (x, y), 5, circle_col, -1, cv2.LINE_AA)
+                cv2.putText(
+                    img,
+                    f"P{idx}",
+                    (x + 5, y - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    0.5,
+                    text_col,
+                    1,
+                    cv2.LINE_AA,
+                )
+            x0, x1 = max(x - 8, 0), min(x + 40, w)
+            y0, y1 = max(y - 20, 0), min(y + 8, h)
+            if x0 < x1 and y0 < y1:
+                a = alpha[y0:y1, x0:x1, None].astype(np.float32) / 255.0
+                self.patches.append(
+                    (
+                        (slice(y0, y1), slice(x0, x1)),
+                        color[y0:y1, x0:x1].astype(np.float32) * a,
+                        1.0 - a,
+                    )
+                )
+
+    def apply(self, img):
+        for region, color, inv_alpha in self.patches:
+            img[region] = (img[region] * inv_alpha + color).astype(np.uint8)
+        return img
+
+
+def _decode_hough(pred):
+    """Points d'une frame par détection de cercles de Hough canal par canal"""
+    pts = []
+    for k in range(14):
+        heat = (pred[k] * 255).astype(np.uint8)
+        pts.append(postprocess(heat, low_thresh=170, max_radius=25))
+    return points_array(pts)
+
+
+def _decode_batch(preds, keypoint_decoder):
+    """Décode les 14 points (tableau (14, 2), NaN si absent) de chaque frame"""
+    if keypoint_decoder == "hough":
+        return [_decode_hough(pred) for pred in preds]
+    if keypoint_decoder == "argmax":
+        return decode_heatmaps(preds[:, :14], low_thresh=170 / 255)[0]
+    raise ValueError(f"Décodeur de points inconnu : {keypoint_decoder}")
+
+
+def _project_court(M):
+    """Points du terrain de référence projetés dans l'image par ``M``"""
+    return cv2.perspectiveTransform(refer_kps, M)[:, 0].astype(np.float64)
+
+
+def _frame_points(img, pts, use_refine_kps, use_homography, homography_method):
+    """Affine les 14 points décodés d'une frame"""
+    if use_refine_kps:
+        pts = pts.copy()
+        for k in np.flatnonzero(~np.isnan(pts).any(axis=1)):
+            x, y = pts[k]
+            if k not in [8, 12, 9] and x and y:
+                pts[k] = refine_kps(img, int(y), int(x))
+
+    if use_homography:
+        M = get_trans_matrix(pts, method=homography_method)
+        if M is not None:
+            pts = _project_court(M)
+    return pts
+
+
+def detect_court(
+    court_model,
+    frames,
+    num_frames,
+    use_refine_kps=False,
+    use_homography=False,
+    homography_method="configurations",
+    keypoint_decoder="argmax",
+    aggregation="mode",
+    convergence=None,
+):
+    """
+    Détecte les 14 points du terrain sur au plus ``num_frames`` frames.
+
+    Args:
+        court_model: Modèle déjà chargé (``load_court_model``)
+        frames: Itérable de frames BGR
+        convergence: ``KeypointConvergence`` optionnel pour s'arrêter dès
+            que les points sont stables
+
+    Returns:
+        tuple: (14 points (x, y) entiers ou None, dispersion (14,))
+    """
+    from terrain.inference import batched
+
+    # Points de chaque frame, NaN pour les points non détectés
+    all_points = np.full((num_frames, 14, 2), np.nan)
+    n = 0
+
+    progress = tqdm(total=num_frames, desc="Terrain Detection")
+    for batch in batched(islice(frames, num_frames), court_model.batch_size):
+        preds = court_model.predict(batch)
+        progress.update(len(batch))
+        for img, pts in zip(batch, _decode_batch(preds, keypoint_decoder)):
+            all_points[n] = _frame_points(
+                img, pts, use_refine_kps, use_homography, homography_method
+            )
+            n += 1
+            if convergence is not None and convergence.update(all_points[n - 1]):
+                break
+        if convergence is not None and convergence.converged:
+            break
+    progress.close()
+    if convergence is not None:
+        state = "convergée" if convergence.converged else "non convergée"
+        print(f"[Terrain] Calibration {state} après {n} frames")
+
+    # Agrégation robuste des détections de chaque point
+    points, dispersion = aggregate_keypoints(all_points[:n], method=aggregation)
+
+    # Homographie finale sur point moyens
+    if use_homography:
+        M = get_trans_matrix(points, method=homography_method)
+        if M is not None:
+            points = _project_court(M)
+    most_freq = [
+        None if np.isnan(p).any() else (int(round(p[0])), int(round(p[1])))
+        for p in points
+    ]
+    return most_freq, dispersion
+
+
 def infer_terrain(
     model_path: str,
     video_path: str,
@@ -46,101 +194,117 @@ def infer_terrain(
     duration: float = 5.0,
     use_refine_kps: bool = False,
     use_homography: bool = False,
+    homography_method: str = "configurations",
+    batch_size: int = 8,
+    keypoint_decoder: str = "argmax",
+    aggregation: str = "mode",
+    adaptive: bool = False,
+    tolerance: float = 2.0,
+    patience: int = 10,
+    max_duration: float = None,
+    cache_dir: str = None,
+    write_annotated: bool = False,
+    backend: str = "torch",
+    onnx_path: str = None,
+    num_threads: int = None,
 ) -> list:
     """
     Détecte les points clés du terrain et génère :
       - Un JSON de points les plus fréquents
-      - Une vidéo annotée avec ces points
+      - Une vidéo annotée avec ces points (si ``write_annotated``)
+
+    Les frames de calibration sont passées au modèle par lots de
+    ``batch_size`` frames. ``keypoint_decoder`` choisit l'extraction des pics
+    des heatmaps : ``"argmax"`` (vectorisée, sub-pixel) ou ``"hough"``
+    (cercles de Hough canal par canal, pour comparer la précision).
+
+    Les détections de chaque point sont agrégées par ``aggregation``
+    (``"mode"``, ``"median"`` ou ``"trimmed_mean"``) et leur dispersion en
+    pixels est écrite dans le JSON.
+
+    ``homography_method`` (``"configurations"`` ou ``"ransac"``) est passé à
+    ``get_trans_matrix`` quand ``use_homography`` est actif.
+
+    En mode ``adaptive``, la détection s'arrête dès que chaque point reste à
+    moins de ``tolerance`` pixels de sa moyenne pendant ``patience`` frames
+    consécutives, et se prolonge au-delà de ``duration`` tant que le terrain
+    n'est pas stable (jusqu'à ``max_duration``, par défaut 3 × ``duration``).
+
+    ``backend`` choisit l'inférence : ``"torch"``, ``"torch_cpu"`` (PyTorch
+    optimisé CPU) ou ``"onnx"`` (ONNX Runtime
+    CPU, modèle ``onnx_path`` éventuellement quantifié en int8) ;
+    ``num_threads`` fixe le nombre de threads intra-op de ces backends CPU.
+
+    Avec ``cache_dir``, une calibration déjà calculée pour la même vue caméra
+    est réutilisée sans charger le modèle (voir ``CalibrationCache``).
     """
-    # Chargement modèle
-    model = BallTrackerNet(out_channels=15)
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    model.to(device)
-    model.load_state_dict(torch.load(model_path, map_location=device))
-    model.eval()
-    print(f"[Terrain] Device: {device}")
-
-    # Lecture vidéo
-    frames, fps = read_video(video_path)
-    all_points = []
-    num_frames = int(fps * duration)
-    OUTPUT_W, OUTPUT_H = 640, 360
-
-    # Détection sur premières frames
-    for img in tqdm(frames[:num_frames], desc="Terrain Detection"):
-        resized = cv2.resize(img, (OUTPUT_W, OUTPUT_H))
-        inp = torch.tensor(
-            np.rollaxis(resized.astype(np.float32) / 255.0, 2, 0)
-        ).unsqueeze(0)
-        out = model(inp.to(device).float())[0]
-        pred = torch.sigmoid(out).detach().cpu().numpy()
-
-        pts = []
-        for k in range(14):
-            heat = (pred[k] * 255).astype(np.uint8)
-            x, y = postprocess(heat, low_thresh=170, max_radius=25)
-            if use_refine_kps and k not in [8, 12, 9] and x and y:
-                x, y = refine_kps(img, int(y), int(x))
-            pts.append((x, y))
-
-        if use_homography:
-            M = get_trans_matrix(pts)
-            if M is not None:
-                arr = np.array([p for p in pts if p], dtype=np.float32).reshape(
-                    -1, 1, 2
-                )
-                trans = cv2.perspectiveTransform(arr, M)
-                pts = [tuple(np.squeeze(p)) for p in trans]
-        all_points.append(pts)
-
-    # Calcul du mode
-    most_freq = []
-    for i in range(14):
-        xs = [f[i][0] for f in all_points if f[i][0] is not None]
-        ys = [f[i][1] for f in all_points if f[i][1] is not None]
-        if xs and ys:
-            mx = mode(xs, keepdims=False).mode
-            my = mode(ys, keepdims=False).mode
-            most_freq.append((int(mx), int(my)))
-        else:
-            most_freq.append(None)
+    fps = get_video_info(video_path)[0]
 
-    # Homographie finale sur point moyens
-    if use_homography:
-        arr = np.array([p for p in most_freq if p], dtype=np.float32).reshape(-1, 1, 2)
-        M = get_trans_matrix(most_freq)
-        if M is not None:
-            trans = cv2.perspectiveTransform(arr, M)
-            most_freq = [tuple(np.squeeze(p)) for p in trans]
+    cache = CalibrationCache(cache_dir) if cache_dir else None
+    cached = cache.lookup(video_path) if cache else None
+    if cached is not None:
+        most_freq, dispersion = cached
+    else:
+        # Import différé : torch n'est chargé qu'en l'absence de cache
+        from terrain.inference import load_court_model
+
+        court_model = load_court_model(
+            model_path,
+            batch_size=batch_size,
+            backend=backend,
+            onnx_path=onnx_path,
+            num_threads=num_threads,
+        )
+        print(f"[Terrain] Device: {court_model.device}")
+
+        num_frames = int(fps * duration)
+        convergence = None
+        if adaptive:
+            num_frames = int(fps * (max_duration or 3 * duration))
+            convergence = KeypointConvergence(tolerance=tolerance, patience=patience)
+
+        # Détection sur premières frames
+        frames = iter_frames(video_path, max_frames=num_frames)
+        most_freq, dispersion = detect_court(
+            court_model,
+            frames,
+            num_frames,
+            use_refine_kps=use_refine_kps,
+            use_homography=use_homography,
+            homography_method=homography_method,
+            keypoint_decoder=keypoint_decoder,
+            aggregation=aggregation,
+            convergence=convergence,
+        )
+        frames.close()
+        if cache and not cache.store(video_path, most_freq, dispersion):
+            print("[Terrain] Homographie introuvable, calibration non mise en cache")
 
     # Écriture JSON
     os.makedirs(os.path.dirname(output_json), exist_ok=True)
     with open(output_json, "w") as jf:
         json.dump(
-            {"points": [({"x": p[0], "y": p[1]} if p else None) for p in most_freq]},
+            {
+                "points": [({"x": p[0], "y": p[1]} if p else None) for p in most_freq],
+                "dispersion": [
+                    None if np.isnan(d) else round(float(d), 2) for d in dispersion
+                ],
+            },
             jf,
             indent=4,
         )
     print(f"[Terrain] JSON saved: {output_json}")
 
-    # Génération vidéo annotée
-    annotated_path = os.path.splitext(output_json)[0] + "_annotated.mp4"
-    frames_upd = []
-    for img in frames:
-        for idx, p in enumerate(most_freq):
-            if p:
-                cv2.circle(img, (p[0], p[1]), 5, (0, 255, 0), -1)
-                cv2.putText(
-                    img,
-                    f"P{idx}",
-                    (p[0] + 5, p[1] - 5),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.5,
-                    (255, 255, 255),
-                    1,
-                )
-        frames_upd.append(img)
-    write_video(frames_upd, fps, annotated_path)
-    print(f"[Terrain] Video saved: {annotated_path}")
+    # Génération vidéo annotée (optionnelle, encodée en arrière-plan)
+    if write_annotated:
+        annotated_path = os.path.splitext(output_json)[0] + "_annotated.mp4"
+        _, width, height, _ = get_video_info(video_path)
+        overlay = KeypointOverlay(most_freq, (height, width))
+        with VideoWriterThread(
+            annotated_path, fps, (width, height), transform=overlay.apply
+        ) as writer:
+            for img in iter_frames(video_path):
+                writer.write(img)
+        print(f"[Terrain] Video saved: {annotated_path}")
 
     return most_freq
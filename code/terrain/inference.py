@@ -0,0 +1,144 @@
+import os
+from itertools import islice
+
+import cv2
+import numpy as np
+import torch
+
+from terrain.cpu_optim import bf16_supported, optimize_for_cpu
+from terrain.tracknet import BallTrackerNet
+
+INPUT_W, INPUT_H = 640, 360
+
+
+def batched(iterable, batch_size):
+    """Regroupe un itérable en listes de ``batch_size`` éléments"""
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def resize_frames(frames, out):
+    """Redimensionne un lot de frames en 640x360 dans le buffer uint8 ``out``"""
+    for i, img in enumerate(frames):
+        cv2.resize(img, (INPUT_W, INPUT_H), dst=out[i])
+    return out[: len(frames)]
+
+
+def load_court_model(
+    model_path, batch_size=8, backend="torch", onnx_path=None, num_threads=None
+):
+    """
+    Charge le modèle de détection du terrain avec le backend choisi.
+
+    Args:
+        backend: ``"torch"`` (PyTorch), ``"torch_cpu"`` (PyTorch optimisé
+            CPU, voir ``cpu_optim``) ou ``"onnx"`` (ONNX Runtime CPU)
+        onnx_path: Modèle ONNX (éventuellement quantifié) ; par défaut
+            ``model_path`` avec l'extension ``.onnx``, exporté s'il n'existe pas
+        num_threads: Nombre de threads intra-op des backends CPU
+            (``"torch_cpu"`` et ``"onnx"``), None = valeur par défaut
+    """
+    if backend == "torch":
+        return CourtKeypointModel(model_path, batch_size=batch_size)
+    if backend == "torch_cpu":
+        return CourtKeypointModel(
+            model_path,
+            device="cpu",
+            batch_size=batch_size,
+            cpu_optimized=True,
+            num_threads=num_threads,
+        )
+    if backend == "onnx":
+        from terrain.onnx_backend import OnnxCourtKeypointModel, export_onnx
+
+        if onnx_path is None:
+            onnx_path = os.path.splitext(model_path)[0] + ".onnx"
+        if not os.path.exists(onnx_path):
+            export_onnx(model_path, onnx_path)
+        return OnnxCourtKeypointModel(
+            onnx_path, batch_size=batch_size, num_threads=num_threads
+        )
+    raise ValueError(f"Backend inconnu : {backend}")
+
+
+class CourtKeypointModel:
+    """
+    Inférence par lots du modèle TrackNet de détection du terrain.
+
+    Les buffers d'entrée (frames redimensionnées et tenseur normalisé) sont
+    alloués une seule fois et réutilisés pour chaque lot ; le tenseur est
+    épinglé en mémoire (pinned) quand le modèle tourne sur GPU.
+
+    Avec ``cpu_optimized`` (sur CPU), les BatchNorm sont repliées dans les
+    convolutions, le modèle passe en channels_last et est compilé
+    (``torch.compile``), et l'inférence se fait en bfloat16 si le CPU le
+    supporte nativement.
+    """
+
+    def __init__(
+        self,
+        model_path,
+        device=None,
+        batch_size=8,
+        out_channels=15,
+        cpu_optimized=False,
+        num_threads=None,
+    ):
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.batch_size = batch_size
+
+        self.model = BallTrackerNet(out_channels=out_channels)
+        self.model.load_state_dict(torch.load(model_path, map_location=self.device))
+        self.model.to(self.device)
+        self.model.eval()
+
+        self.channels_last = cpu_optimized and self.device == "cpu"
+        self.bf16 = self.channels_last and bf16_supported()
+        if self.channels_last:
+            self.model = optimize_for_cpu(
+                self.model,
+                bf16=self.bf16,
+                compile=True,
+                num_threads=num_threads,
+                warmup_batch=batch_size,
+            )
+
+        self._resized = np.empty((batch_size, INPUT_H, INPUT_W, 3), dtype=np.uint8)
+        self._input = torch.empty(
+            (batch_size, 3, INPUT_H, INPUT_W),
+            dtype=torch.float32,
+            pin_memory=self.device == "cuda",
+        )
+
+    def preprocess(self, frames):
+        """
+        Redimensionne, normalise et passe en CHW un lot de frames BGR.
+
+        Returns:
+            torch.Tensor: vue (n, 3, 360, 640) sur le buffer d'entrée
+        """
+        resized = resize_frames(frames, self._resized)
+        inp = self._input[: len(frames)]
+        inp.copy_(torch.from_numpy(resized).permute(0, 3, 1, 2))
+        inp.div_(255.0)
+        return inp
+
+    def predict(self, frames):
+        """
+        Calcule les heatmaps (après sigmoïde) d'un lot d'au plus
+        ``batch_size`` frames.
+
+        Returns:
+            np.ndarray: heatmaps de forme (n, canaux, 360, 640)
+        """
+        inp = self.preprocess(frames).to(self.device, non_blocking=True)
+        if self.channels_last:
+            inp = inp.contiguous(memory_format=torch.channels_last)
+        with torch.inference_mode():
+            with torch.autocast("cpu", torch.bfloat16, enabled=self.bf16):
+                out = self.model(inp)
+            return torch.sigmoid(out.float()).cpu().numpy()
@@ -0,0 +1,162 @@
+import numpy as np
+import onnxruntime as ort
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    QuantFormat,
+    QuantType,
+    quantize_dynamic,
+    quantize_static,
+)
+
+from terrain.inference import INPUT_H, INPUT_W, resize_frames
+from terrain.postprocess import decode_heatmaps
+from terrain.video_io import iter_frames
+
+
+def export_onnx(model_path, onnx_path, out_channels=15, opset=17):
+    """
+    Exporte ``BallTrackerNet`` (poids ``model_path``) en ONNX, sigmoïde
+    incluse, avec une taille de lot dynamique.
+    """
+    import torch
+
+    from terrain.tracknet import BallTrackerNet
+
+    model = BallTrackerNet(out_channels=out_channels)
+    model.load_state_dict(torch.load(model_path, map_location="cpu"))
+    wrapped = torch.nn.Sequential(model, torch.nn.Sigmoid()).eval()
+    torch.onnx.export(
+        wrapped,
+        torch.rand(1, 3, INPUT_H, INPUT_W),
+        onnx_path,
+        input_names=["input"],
+        output_names=["heatmaps"],
+        dynamic_axes={"input": {0: "batch"}, "heatmaps": {0: "batch"}},
+        opset_version=opset,
+        dynamo=False,
+    )
+    print(f"[Terrain] ONNX exporté : {onnx_path}")
+    return onnx_path
+
+
+class VideoCalibrationReader(CalibrationDataReader):
+    """
+    Données de calibration pour la quantification statique : frames
+    prétraitées prises toutes les ``stride`` frames dans nos vidéos.
+    """
+
+    def __init__(self, video_paths, frames_per_video=32, stride=10):
+        self.video_paths = list(video_paths)
+        self.frames_per_video = frames_per_video
+        self.stride = stride
+        self._iter = self._samples()
+
+    def _samples(self):
+        resized = np.empty((1, INPUT_H, INPUT_W, 3), dtype=np.uint8)
+        for path in self.video_paths:
+            frames = iter_frames(path, max_frames=self.frames_per_video * self.stride)
+            for i, frame in enumerate(frames):
+                if i % self.stride == 0:
+                    inp = resize_frames([frame], resized).transpose(0, 3, 1, 2)
+                    yield {"input": inp.astype(np.float32) / np.float32(255.0)}
+
+    def get_next(self):
+        return next(self._iter, None)
+
+    def rewind(self):
+        self._iter = self._samples()
+
+
+def quantize_onnx(onnx_path, output_path, mode="dynamic", calibration_videos=None):
+    """
+    Quantifie le modèle ONNX en int8.
+
+    Args:
+        mode: ``"dynamic"`` (poids int8, activations quantifiées à la volée)
+            ou ``"static"`` (activations calibrées sur ``calibration_videos``)
+        calibration_videos: Vidéos utilisées par ``VideoCalibrationReader``
+    """
+    if mode == "dynamic":
+        quantize_dynamic(onnx_path, output_path, weight_type=QuantType.QInt8)
+    elif mode == "static":
+        if not calibration_videos:
+            raise ValueError("La quantification statique nécessite des vidéos")
+        quantize_static(
+            onnx_path,
+            output_path,
+            VideoCalibrationReader(calibration_videos),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+        )
+    else:
+        raise ValueError(f"Mode de quantification inconnu : {mode}")
+    print(f"[Terrain] Modèle quantifié ({mode}) : {output_path}")
+    return output_path
+
+
+class OnnxCourtKeypointModel:
+    """
+    Inférence du modèle du terrain avec ONNX Runtime sur CPU ; même
+    interface que ``CourtKeypointModel`` (buffers d'entrée réutilisés).
+    """
+
+    def __init__(self, onnx_path, batch_size=8, num_threads=None):
+        self.device = "cpu"
+        self.batch_size = batch_size
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            onnx_path, options, providers=["CPUExecutionProvider"]
+        )
+        self._resized = np.empty((batch_size, INPUT_H, INPUT_W, 3), dtype=np.uint8)
+        self._input = np.empty((batch_size, 3, INPUT_H, INPUT_W), dtype=np.float32)
+
+    def predict(self, frames):
+        """
+        Calcule les heatmaps (après sigmoïde) d'un lot d'au plus
+        ``batch_size`` frames.
+
+        Returns:
+            np.ndarray: heatmaps de forme (n, canaux, 360, 640)
+        """
+        resized = resize_frames(frames, self._resized)
+        inp = self._input[: len(frames)]
+        np.copyto(inp, resized.transpose(0, 3, 1, 2))
+        inp /= np.float32(255.0)
+        return self.session.run(None, {"input": inp})[0]
+
+
+def check_parity(reference, candidate, video_path, num_frames=30, low_thresh=170 / 255):
+    """
+    Compare les points du terrain décodés par deux modèles (par exemple
+    PyTorch et ONNX quantifié) sur les premières frames d'une vidéo.
+
+    Returns:
+        dict: dérive moyenne / max (pixels) des points détectés par les deux
+        modèles et nombre de points détectés par un seul des deux
+    """
+    drifts, mismatches = [], 0
+    frames = list(iter_frames(video_path, max_frames=num_frames))
+    step = min(reference.batch_size, candidate.batch_size)
+    for start in range(0, len(frames), step):
+        batch = frames[start : start + step]
+        ref_xy, _ = decode_heatmaps(reference.predict(batch)[:, :14], low_thresh)
+        cand_xy, _ = decode_heatmaps(candidate.predict(batch)[:, :14], low_thresh)
+        ref_ok = ~np.isnan(ref_xy).any(axis=2)
+        cand_ok = ~np.isnan(cand_xy).any(axis=2)
+        mismatches += int((ref_ok != cand_ok).sum())
+        both = ref_ok & cand_ok
+        drifts.extend(np.linalg.norm(ref_xy - cand_xy, axis=2)[both].tolist())
+
+    report = {
+        "frames": len(frames),
+        "mean_drift_px": float(np.mean(drifts)) if drifts else None,
+        "max_drift_px": float(np.max(drifts)) if drifts else None,
+        "detection_mismatches": mismatches,
+    }
+    print(f"[Terrain] Parité : {report}")
+    return report
@@ -1,6 +1,6 @@
 import cv2
 import numpy as np
-from scipy.spatial import distance
+from math import dist
 from .utils import line_intersection
 
 
@@ -23,6 +23,61 @@ def postprocess(heatmap, scale=2, low_thresh=155, min_radius=10, max_radius=30):
     return x_pred, y_pred
 
 
+def decode_heatmaps(heatmaps, low_thresh=170 / 255, scale=2, radius=25, iterations=2):
+    """
+    Décode en une fois les pics de toutes les heatmaps (sortie sigmoïde).
+
+    Pour chaque canal : argmax masqué par le seuil, puis barycentre des valeurs
+    au-dessus du seuil dans une fenêtre (2 * radius + 1)² autour du pic. Les
+    taches font 10 à 25 pixels (``max_radius`` de la version Hough) et sont
+    souvent saturées : l'argmax tombe alors sur un coin du plateau. La
+    fenêtre couvre donc toute la tache et est recentrée sur le barycentre
+    ``iterations`` fois pour obtenir une position sub-pixel non biaisée.
+
+    Args:
+        heatmaps: Tableau (..., H, W) de valeurs dans [0, 1]
+        low_thresh: Seuil de détection (même échelle que les heatmaps)
+        scale: Facteur entre la résolution des heatmaps et celle de l'image
+        radius: Demi-taille de la fenêtre (au moins le rayon des taches)
+        iterations: Nombre de recentrages de la fenêtre sur le barycentre
+
+    Returns:
+        tuple: (xy, conf) - coordonnées (..., 2) avec NaN pour les points
+        non détectés, et confiance (...) = valeur du pic
+    """
+    heatmaps = np.asarray(heatmaps, dtype=np.float32)
+    lead_shape = heatmaps.shape[:-2]
+    h, w = heatmaps.shape[-2:]
+    flat = heatmaps.reshape(-1, h * w)
+    n = flat.shape[0]
+
+    peak = flat.argmax(axis=1)
+    conf = flat[np.arange(n), peak]
+    valid = conf >= low_thresh
+    py, px = np.divmod(peak, w)
+    cy, cx = py.astype(np.float64), px.astype(np.float64)
+
+    offsets = np.arange(-radius, radius + 1)
+    rows = np.arange(n)[:, None, None]
+    maps = heatmaps.reshape(n, h, w)
+    for _ in range(1 + iterations):
+        ys = np.rint(cy).astype(np.int64)[:, None] + offsets  # (n, fenêtre)
+        xs = np.rint(cx).astype(np.int64)[:, None] + offsets
+        inside = ((ys >= 0) & (ys < h))[:, :, None] & ((xs >= 0) & (xs < w))[:, None, :]
+        window = maps[
+            rows, np.clip(ys, 0, h - 1)[:, :, None], np.clip(xs, 0, w - 1)[:, None, :]
+        ]
+        weights = np.where(inside & (window >= low_thresh), window, 0.0)
+        total = weights.sum(axis=(1, 2))
+        total = np.where(valid & (total > 0), total, 1.0)
+        cy = (weights.sum(axis=2) * ys).sum(axis=1) / total
+        cx = (weights.sum(axis=1) * xs).sum(axis=1) / total
+
+    xy = np.stack([cx, cy], axis=-1) * scale
+    xy[~valid] = np.nan
+    return xy.reshape(*lead_shape, 2), conf.reshape(lead_shape)
+
+
 def refine_kps(img, x_ct, y_ct, crop_size=40):
     refined_x_ct, refined_y_ct = x_ct, y_ct
 
@@ -77,8 +132,8 @@ def merge_lines(lines):
                 if mask[i + j + 1]:
                     x1, y1, x2, y2 = line
                     x3, y3, x4, y4 = s_line
-                    dist1 = distance.euclidean((x1, y1), (x3, y3))
-                    dist2 = distance.euclidean((x2, y2), (x4, y4))
+                    dist1 = dist((x1, y1), (x3, y3))
+                    dist2 = dist((x2, y2), (x4, y4))
                     if dist1 < 20 and dist2 < 20:
                         line = np.array(
                             [
@@ -0,0 +1,189 @@
+import threading
+
+import cv2
+import numpy as np
+
+from terrain.infer_in_video import detect_court
+from terrain.timeline import CourtTimeline
+from terrain.video_io import get_video_info, iter_frames
+
+
+class CourtMotionMonitor:
+    """
+    Détecte à moindre coût un changement de vue caméra.
+
+    Des points ORB de la frame de référence (celle de la dernière
+    calibration) sont appariés avec ceux de la frame courante ; une
+    homographie RANSAC entre les deux donne le déplacement des points du
+    terrain. Trop peu d'appariements (coupure, ralenti) compte comme un
+    changement de vue.
+
+    Si la dernière calibration n'a trouvé aucun point du terrain (gros plan,
+    public, ralenti), la référence est gardée et le déplacement est mesuré
+    sur les coins de l'image : la vue n'est considérée comme changée (et le
+    terrain recherché à nouveau) que lorsqu'elle ne correspond plus à cette
+    référence.
+    """
+
+    def __init__(self, scale=0.5, num_features=500, min_matches=30):
+        self.scale = scale
+        self.min_matches = min_matches
+        self._orb = cv2.ORB_create(nfeatures=num_features)
+        self._matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+        self._ref_desc = None
+        self._ref_points = None
+
+    def _features(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, None, fx=self.scale, fy=self.scale)
+        return self._orb.detectAndCompute(small, None)
+
+    def set_reference(self, frame, points):
+        """Mémorise la frame et les points du terrain de la calibration courante"""
+        self._ref_kps, self._ref_desc = self._features(frame)
+        anchors = [p for p in points if p is not None]
+        if not anchors:
+            # Pas de terrain : les coins de l'image servent de repères
+            h, w = frame.shape[:2]
+            anchors = [(0, 0), (w - 1, 0), (w - 1, h - 1), (0, h - 1)]
+        self._ref_points = np.array(anchors, dtype=np.float32).reshape(-1, 1, 2)
+
+    def drift(self, frame):
+        """
+        Déplacement maximal (pixels) des points du terrain (ou des coins de
+        l'image) entre la frame de référence et ``frame`` ; ``inf`` si la vue
+        n'est plus reconnue.
+        """
+        if self._ref_points is None:
+            return np.inf
+        kps, desc = self._features(frame)
+        if self._ref_desc is None or desc is None:
+            # Frame de référence sans points ORB (image uniforme, fondu) :
+            # la vue ne change que si des points apparaissent ou disparaissent
+            return 0.0 if self._ref_desc is None and desc is None else np.inf
+        matches = self._matcher.match(self._ref_desc, desc)
+        if len(matches) < self.min_matches:
+            return np.inf
+
+        src = np.float32([self._ref_kps[m.queryIdx].pt for m in matches])
+        dst = np.float32([kps[m.trainIdx].pt for m in matches])
+        H, inliers = cv2.findHomography(
+            src / self.scale, dst / self.scale, cv2.RANSAC, 3.0
+        )
+        if H is None or inliers.sum() < self.min_matches:
+            return np.inf
+        moved = cv2.perspectiveTransform(self._ref_points, H)
+        return float(np.linalg.norm(moved - self._ref_points, axis=2).max())
+
+
+def recalibrate_video(
+    model_path,
+    video_path,
+    output_json,
+    sample_interval=15,
+    max_drift=8.0,
+    calibration_frames=15,
+    batch_size=8,
+    backend="torch",
+    onnx_path=None,
+    num_threads=None,
+    timeline=None,
+    **detect_options,
+):
+    """
+    Calibre le terrain sur toute la vidéo, en relançant ``BallTrackerNet``
+    uniquement quand la vue caméra a changé.
+
+    Toutes les ``sample_interval`` frames, le déplacement de la vue depuis la
+    dernière calibration est estimé (``CourtMotionMonitor``). S'il dépasse
+    ``max_drift`` pixels, le terrain est redétecté sur les
+    ``calibration_frames`` frames suivantes et une nouvelle calibration,
+    valable à partir de cette frame, est ajoutée à la ``CourtTimeline``
+    écrite dans ``output_json``.
+
+    ``timeline`` permet de partager la ``CourtTimeline`` avec un autre
+    thread : au fil de la vidéo, ``mark_final`` y signale jusqu'à quelle
+    frame les calibrations sont définitives (jusqu'à la veille d'une
+    fenêtre de recalibration en cours).
+
+    Args:
+        backend, onnx_path, num_threads: Backend d'inférence (voir
+            ``load_court_model``)
+        detect_options: Options passées à ``detect_court`` (``use_refine_kps``,
+            ``keypoint_decoder``, ``aggregation``...)
+
+    Returns:
+        CourtTimeline: Calibrations indexées par frame
+    """
+    fps = get_video_info(video_path)[0]
+    if timeline is None:
+        timeline = CourtTimeline()
+    timeline.fps = fps
+    monitor = CourtMotionMonitor()
+    court_model = None
+    window = []
+    window_start = None
+
+    def calibrate():
+        nonlocal court_model
+        if court_model is None:
+            from terrain.inference import load_court_model
+
+            court_model = load_court_model(
+                model_path,
+                batch_size=batch_size,
+                backend=backend,
+                onnx_path=onnx_path,
+                num_threads=num_threads,
+            )
+        points, dispersion = detect_court(
+            court_model, window, len(window), **detect_options
+        )
+        timeline.add(window_start, points, dispersion)
+        monitor.set_reference(window[0], points)
+        print(f"[Terrain] Calibration à partir de la frame {window_start}")
+
+    try:
+        for frame_no, frame in enumerate(iter_frames(video_path)):
+            if window_start is None and (
+                len(timeline) == 0
+                or (
+                    frame_no % sample_interval == 0 and monitor.drift(frame) > max_drift
+                )
+            ):
+                window_start = frame_no
+            if window_start is None:
+                timeline.mark_final(frame_no)
+                continue
+
+            # Accumulation des frames de la fenêtre de recalibration
+            window.append(frame)
+            if len(window) == calibration_frames:
+                calibrate()
+                window, window_start = [], None
+                timeline.mark_final(frame_no)
+
+        # Fenêtre incomplète en fin de vidéo
+        if window:
+            calibrate()
+    finally:
+        # Fin de vidéo (ou erreur) : ne plus faire attendre les autres threads
+        timeline.mark_final(float("inf"))
+
+    timeline.save(output_json)
+    print(f"[Terrain] {len(timeline)} calibration(s) saved: {output_json}")
+    return timeline
+
+
+def start_background_recalibration(*args, **kwargs):
+    """
+    Lance ``recalibrate_video`` dans un thread (par exemple pendant la
+    détection de balle). Le thread doit être rejoint (``join``) avant
+    d'utiliser la ``CourtTimeline`` écrite sur disque ; une ``timeline``
+    passée en argument est lisible pendant le calcul (``wait_final``).
+    """
+    thread = threading.Thread(
+        target=recalibrate_video, args=args, kwargs=kwargs, daemon=True
+    )
+    thread.start()
+    return thread
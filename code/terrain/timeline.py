@@ -0,0 +1,102 @@
+import json
+import threading
+from bisect import bisect_right
+from math import isnan
+
+
+class CourtTimeline:
+    """
+    Suite de calibrations du terrain indexée par numéro de frame.
+
+    Chaque calibration s'applique de sa ``start_frame`` jusqu'à la suivante.
+    Le JSON sauvegardé contient la clé ``"calibrations"`` ; ``court_json``
+    renvoie pour une frame le JSON ``{"points": ...}`` attendu par
+    ``detection_fautes``.
+
+    Pendant une recalibration en arrière-plan, la suite est partagée entre
+    threads : ``final_frame`` est la dernière frame dont la calibration est
+    définitive et ``wait_final`` attend qu'une frame le devienne.
+    """
+
+    def __init__(self, fps=None):
+        self.fps = fps
+        self.start_frames = []
+        self.calibrations = []
+        self.final_frame = -1
+        self._cond = threading.Condition()
+
+    def add(self, start_frame, points, dispersion=None):
+        """Ajoute une calibration valable à partir de ``start_frame``"""
+        if dispersion is not None:
+            dispersion = [None if isnan(d) else round(float(d), 2) for d in dispersion]
+        calibration = {
+            "start_frame": start_frame,
+            "points": [({"x": p[0], "y": p[1]} if p else None) for p in points],
+            "dispersion": dispersion,
+        }
+        with self._cond:
+            idx = bisect_right(self.start_frames, start_frame)
+            self.start_frames.insert(idx, start_frame)
+            self.calibrations.insert(idx, calibration)
+
+    def mark_final(self, frame):
+        """Déclare définitives les calibrations jusqu'à la frame ``frame``"""
+        with self._cond:
+            self.final_frame = frame
+            self._cond.notify_all()
+
+    def wait_final(self, frame, timeout=None):
+        """
+        Attend que la calibration en vigueur à ``frame`` soit définitive.
+
+        Returns:
+            bool: False si ``timeout`` (secondes) a expiré avant
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self.final_frame >= frame, timeout)
+
+    def __len__(self):
+        return len(self.calibrations)
+
+    def lookup(self, frame):
+        """Calibration en vigueur à la frame ``frame`` (la première si avant)"""
+        with self._cond:
+            if not self.calibrations:
+                return None
+            idx = max(bisect_right(self.start_frames, frame) - 1, 0)
+            return self.calibrations[idx]
+
+    def court_json(self, frame):
+        """JSON ``{"points": [...]}`` du terrain en vigueur à ``frame``"""
+        calibration = self.lookup(frame)
+        if calibration is None:
+            return None
+        return json.dumps({"points": calibration["points"]})
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"fps": self.fps, "calibrations": self.calibrations}, f, indent=4)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            data = json.load(f)
+        timeline = cls(fps=data.get("fps"))
+        for calibration in data["calibrations"]:
+            timeline.start_frames.append(calibration["start_frame"])
+            timeline.calibrations.append(calibration)
+        timeline.final_frame = float("inf")
+        return timeline
+
+
+def court_json_for_frame(terrain_json_path, frame):
+    """
+    Renvoie le JSON du terrain à utiliser pour ``frame``, que le fichier soit
+    une calibration unique (``terrain_points.json``) ou une suite de
+    calibrations (``CourtTimeline``).
+    """
+    with open(terrain_json_path, "r") as f:
+        terrain_str = f.read()
+    if '"calibrations"' not in terrain_str:
+        return terrain_str
+    return CourtTimeline.load(terrain_json_path).court_json(frame)
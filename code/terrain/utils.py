@@ -1,6 +1,4 @@
 import numpy as np
-from sympy import Line 
-import sympy
 
 def gaussian2D(shape, sigma=1):
     m, n = [(ss - 1.) / 2. for ss in shape]
@@ -50,19 +48,37 @@ def gaussian_radius(det_size, min_overlap=0.7):
     r3  = (b3 + sq3) / 2
     return min(r1, r2, r3)
 
+def line_intersections(lines1, lines2, eps=1e-9):
+    """
+    Find the intersection points of many line pairs at once
+    lines1, lines2: arrays (N, 4) of x1, y1, x2, y2 (infinite lines through both points)
+    Returns an (N, 2) array, NaN where lines are parallel or degenerate
+    """
+    lines1 = np.asarray(lines1, dtype=np.float64).reshape(-1, 4)
+    lines2 = np.asarray(lines2, dtype=np.float64).reshape(-1, 4)
+    p1, d1 = lines1[:, :2], lines1[:, 2:] - lines1[:, :2]
+    p3, d2 = lines2[:, :2], lines2[:, 2:] - lines2[:, :2]
+
+    denom = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]
+    scale = np.linalg.norm(d1, axis=1) * np.linalg.norm(d2, axis=1)
+    parallel = np.abs(denom) <= eps * scale
+    denom = np.where(parallel, 1.0, denom)
+
+    diff = p3 - p1
+    t = (diff[:, 0] * d2[:, 1] - diff[:, 1] * d2[:, 0]) / denom
+    points = p1 + t[:, None] * d1
+    points[parallel] = np.nan
+    return points
+
+
 def line_intersection(line1, line2):
     """
     Find 2 lines intersection point
     """
-    l1 = Line((line1[0], line1[1]), (line1[2], line1[3]))
-    l2 = Line((line2[0], line2[1]), (line2[2], line2[3]))
-
-    intersection = l1.intersection(l2)
-    point = None
-    if len(intersection) > 0:
-        if isinstance(intersection[0], sympy.geometry.point.Point2D):
-            point = intersection[0].coordinates
-    return point
+    point = line_intersections(line1, line2)[0]
+    if np.isnan(point).any():
+        return None
+    return tuple(point)
 
 
 def is_point_in_image(x, y, input_width=1280, input_height=720):
@@ -0,0 +1,142 @@
+import queue
+import threading
+import time
+
+import cv2
+
+_END = object()
+
+
+def get_video_info(path_video):
+    """
+    Lit les métadonnées de la vidéo sans décoder de frame.
+
+    Returns:
+        tuple: (fps, largeur, hauteur, nombre de frames)
+    """
+    cap = cv2.VideoCapture(path_video)
+    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return fps, width, height, total_frames
+
+
+def iter_frames(path_video, max_frames=None, prefetch=8, stats=None):
+    """
+    Décode la vidéo à la demande et renvoie les frames une par une.
+
+    Le décodage tourne dans un thread séparé qui remplit une file bornée de
+    ``prefetch`` frames : la mémoire utilisée reste constante quelle que soit
+    la durée de la vidéo. Le décodage s'arrête après ``max_frames`` frames.
+
+    Args:
+        path_video: Chemin vers la vidéo
+        max_frames: Nombre maximum de frames à lire (None = toute la vidéo)
+        prefetch: Taille de la file de préchargement
+        stats: Objet optionnel dont les attributs ``busy`` (temps de
+            décodage), ``wait`` (attente sur la file pleine) et ``items``
+            sont incrémentés par le thread de décodage
+
+    Yields:
+        np.ndarray: Frame BGR
+    """
+    frames = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+
+    def decode():
+        cap = cv2.VideoCapture(path_video)
+        count = 0
+        try:
+            while not stop.is_set() and (max_frames is None or count < max_frames):
+                start = time.perf_counter()
+                ret, frame = cap.read()
+                decoded = time.perf_counter()
+                if not ret:
+                    break
+                # put avec timeout pour pouvoir s'arrêter si le consommateur abandonne
+                while not stop.is_set():
+                    try:
+                        frames.put(frame, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                count += 1
+                if stats is not None:
+                    stats.busy += decoded - start
+                    stats.wait += time.perf_counter() - decoded
+                    stats.items += 1
+        finally:
+            cap.release()
+            frames.put(_END)
+
+    worker = threading.Thread(target=decode, daemon=True)
+    worker.start()
+    try:
+        while True:
+            frame = frames.get()
+            if frame is _END:
+                break
+            yield frame
+    finally:
+        stop.set()
+        # Vider la file pour débloquer le thread de décodage
+        while worker.is_alive():
+            try:
+                frames.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        worker.join()
+
+
+class VideoWriterThread:
+    """
+    Encodeur vidéo en arrière-plan.
+
+    ``write`` dépose la frame dans une file bornée (le producteur attend si
+    l'encodeur est en retard) ; un thread applique ``transform`` (annotation
+    par exemple) puis encode. S'utilise comme gestionnaire de contexte.
+    """
+
+    def __init__(self, path_output_video, fps, size, transform=None, queue_size=16):
+        self.path = path_output_video
+        self.transform = transform
+        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+        self._writer = cv2.VideoWriter(path_output_video, fourcc, fps, size)
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is _END:
+                break
+            if self._error is not None:
+                continue
+            try:
+                if self.transform is not None:
+                    frame = self.transform(frame)
+                self._writer.write(frame)
+            except Exception as exc:  # remonté au thread appelant dans close()
+                self._error = exc
+        self._writer.release()
+
+    def write(self, frame):
+        self._queue.put(frame)
+
+    def close(self):
+        """Attend la fin de l'encodage et ferme le fichier"""
+        if self._thread.is_alive():
+            self._queue.put(_END)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()